@@ -2,6 +2,8 @@
 -- This script creates the main table for storing PDF processing results with redaction support
 
 -- Drop existing tables if they exist (for clean setup)
+DROP TABLE IF EXISTS stats_rollup;
+DROP TABLE IF EXISTS findings_rollup;
 DROP TABLE IF EXISTS email_index;
 DROP TABLE IF EXISTS ssn_index;
 DROP TABLE IF EXISTS pdf_uploads;
@@ -14,44 +16,54 @@ CREATE TABLE pdf_uploads (
     file_size UInt64,
     upload_date DateTime,
     processing_date Nullable(DateTime),
-    status String,
+    status LowCardinality(String),
     pages_processed UInt32,
     text_length UInt32,
     processing_time Float32,
     emails Array(String),
     ssns Array(String),
+    email_count UInt32 MATERIALIZED length(emails),
+    ssn_count UInt32 MATERIALIZED length(ssns),
+    is_clean UInt8 MATERIALIZED email_count = 0 AND ssn_count = 0,
     error_message Nullable(String),
     -- Redaction fields
     redaction_applied UInt8 DEFAULT 0,
     redacted_file_available UInt8 DEFAULT 0,
     total_redactions UInt32 DEFAULT 0,
-    redacted_file_path Nullable(String)
+    redacted_file_path Nullable(String),
+    -- Point lookups by upload_id now that it is not the key prefix
+    INDEX idx_upload_id upload_id TYPE bloom_filter GRANULARITY 4
 ) ENGINE = MergeTree()
-ORDER BY (upload_id, upload_date);
+PARTITION BY toYYYYMM(upload_date)
+ORDER BY (upload_date, upload_id);
 
--- Create materialized view for fast email lookups
-CREATE MATERIALIZED VIEW email_index
-ENGINE = MergeTree()
-ORDER BY (email, upload_date)
+-- Running totals for the statistics endpoint
+CREATE MATERIALIZED VIEW stats_rollup
+ENGINE = SummingMergeTree()
+ORDER BY tuple()
 AS SELECT
-    upload_id,
-    upload_date,
-    email,
-    filename
+    count() as total_uploads,
+    countIf(is_clean) as clean_pdfs,
+    countIf(NOT is_clean) as pii_pdfs,
+    sum(email_count) as total_emails,
+    sum(ssn_count) as total_ssns,
+    sum(processing_time) as total_processing_time
 FROM pdf_uploads
-ARRAY JOIN emails AS email;
+WHERE status = 'complete';
 
--- Create materialized view for fast SSN lookups
-CREATE MATERIALIZED VIEW ssn_index
-ENGINE = MergeTree()
-ORDER BY (ssn, upload_date)
+-- Aggregate states behind the findings metrics
+CREATE MATERIALIZED VIEW findings_rollup
+ENGINE = AggregatingMergeTree()
+ORDER BY tuple()
 AS SELECT
-    upload_id,
-    upload_date,
-    ssn,
-    filename
-FROM pdf_uploads
-ARRAY JOIN ssns AS ssn;
+    countState() as total_pdfs,
+    sumState(toUInt64(email_count + ssn_count)) as total_pii_items,
+    countIfState(status = 'complete') as successful_uploads,
+    avgState(processing_time) as avg_processing_time,
+    sumState(toUInt64(email_count)) as total_emails,
+    sumState(toUInt64(ssn_count)) as total_ssns,
+    quantileTDigestIfState(0.95)(processing_time, processing_time > 0) as p95_processing_time
+FROM pdf_uploads;
 
 -- Create materialized view for redaction statistics
 CREATE MATERIALIZED VIEW redaction_stats
@@ -75,11 +87,11 @@ ORDER BY (upload_date)
 AS SELECT
     toDate(upload_date) as date,
     COUNT(*) as total_uploads,
-    SUM(length(emails)) as total_emails,
-    SUM(length(ssns)) as total_ssns,
-    SUM(length(emails) + length(ssns)) as total_pii_items,
-    COUNT(CASE WHEN length(emails) = 0 AND length(ssns) = 0 THEN 1 END) as clean_files,
-    COUNT(CASE WHEN length(emails) > 0 OR length(ssns) > 0 THEN 1 END) as pii_files
+    SUM(email_count) as total_emails,
+    SUM(ssn_count) as total_ssns,
+    SUM(email_count + ssn_count) as total_pii_items,
+    countIf(is_clean) as clean_files,
+    countIf(NOT is_clean) as pii_files
 FROM pdf_uploads
 GROUP BY toDate(upload_date);
 
@@ -173,10 +185,6 @@ INSERT INTO pdf_uploads VALUES
 SELECT 'Database initialized successfully' as status;
 SELECT 'pdf_uploads' as table_name, count() as record_count FROM pdf_uploads
 UNION ALL
-SELECT 'email_index' as table_name, count() as record_count FROM email_index
-UNION ALL
-SELECT 'ssn_index' as table_name, count() as record_count FROM ssn_index
-UNION ALL
 SELECT 'redaction_stats' as table_name, count() as record_count FROM redaction_stats
 UNION ALL
 SELECT 'pii_stats' as table_name, count() as record_count FROM pii_stats
@@ -1,10 +1,30 @@
 """
 ClickHouse client utility for PDF Scanner App
 """
+import functools
 import os
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import time
+from typing import List, Dict, Any, Iterator, Optional
+from datetime import datetime, timezone
 from clickhouse_connect import get_client
+from clickhouse_pool import CONNECT_TIMEOUT_SECONDS, make_pool_manager
+from utils import LRUCache
+
+# Read-only query results are reused for this long, or until the next insert
+CACHE_TTL_SECONDS = 5.0
+CACHE_MAX_ENTRIES = 256
+
+# Column order of the scan_results table
+SCAN_RESULT_COLUMNS = [
+    'doc_id',
+    'scanned_at',
+    'emails',
+    'ssns',
+    'source_path',
+    'file_size',
+    'scan_duration',
+    'status'
+]
 
 
 class ClickHouseClient:
@@ -12,6 +32,7 @@ class ClickHouseClient:
     
     def __init__(self):
         self.client = None
+        self._cache = LRUCache(CACHE_MAX_ENTRIES)
         self._connect()
     
     def _connect(self):
@@ -23,13 +44,29 @@ class ClickHouseClient:
                 port=int(os.getenv('CLICKHOUSE_PORT', 8123)),
                 username=os.getenv('CLICKHOUSE_USER', 'app'),
                 password=os.getenv('CLICKHOUSE_PASSWORD', 'secret'),
-                database=os.getenv('CLICKHOUSE_DATABASE', 'pdf_scan')
+                database=os.getenv('CLICKHOUSE_DATABASE', 'pdf_scan'),
+                # Pooled connections and no shared session let concurrent
+                # requests run their queries in parallel on one client
+                pool_mgr=make_pool_manager(),
+                autogenerate_session_id=False,
+                connect_timeout=CONNECT_TIMEOUT_SECONDS
             )
             print("✅ Connected to ClickHouse successfully")
         except Exception as e:
             print(f"❌ Failed to connect to ClickHouse: {e}")
             raise
     
+    def _cache_get(self, key: tuple) -> Optional[Any]:
+        """Return a cached query result if it is still fresh"""
+        entry = self._cache.get(key)
+        if entry is None or time.monotonic() - entry[0] >= CACHE_TTL_SECONDS:
+            return None
+        return entry[1]
+    
+    def _cache_put(self, key: tuple, value: Any):
+        """Cache a query result, evicting the least recently used entry when full"""
+        self._cache.put(key, (time.monotonic(), value))
+    
     def insert_scan_result(self, 
                           doc_id: str,
                           emails: List[str],
@@ -54,21 +91,15 @@ class ClickHouseClient:
             bool: True if successful, False otherwise
         """
         try:
-            # Use raw SQL command for insertion
-            query = f"""
-            INSERT INTO scan_results VALUES (
-                '{doc_id}',
-                now(),
-                {emails},
-                {ssns},
-                '{source_path}',
-                {file_size},
-                {scan_duration},
-                '{status}'
+            # Use the native insert path so no SQL text is built per row
+            self.client.insert(
+                'scan_results',
+                [[doc_id, datetime.now(timezone.utc), emails, ssns, source_path,
+                  file_size, scan_duration, status]],
+                column_names=SCAN_RESULT_COLUMNS
             )
-            """
-            
-            self.client.command(query)
+            # New rows change every cached search and aggregate
+            self._cache.clear()
             print(f"✅ Inserted scan result for {doc_id}")
             return True
             
@@ -76,6 +107,41 @@ class ClickHouseClient:
             print(f"❌ Failed to insert scan result: {e}")
             return False
     
+    def insert_scan_results_batch(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Insert several scan results into ClickHouse in one request
+        
+        Args:
+            rows: Scan results, each with the keyword arguments of
+                insert_scan_result
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not rows:
+            return True
+        
+        try:
+            # One insert creates one part on the server however many rows it
+            # carries, and costs a single round trip
+            scanned_at = datetime.now(timezone.utc)
+            self.client.insert(
+                'scan_results',
+                [[row['doc_id'], scanned_at, row['emails'], row['ssns'],
+                  row['source_path'], row.get('file_size', 0),
+                  row.get('scan_duration', 0.0), row.get('status', 'completed')]
+                 for row in rows],
+                column_names=SCAN_RESULT_COLUMNS
+            )
+            # New rows change every cached search and aggregate
+            self._cache.clear()
+            print(f"✅ Inserted {len(rows)} scan results")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Failed to insert scan results: {e}")
+            return False
+    
     def get_scan_results(self, limit: int = 100) -> List[Dict[str, Any]]:
         """
         Get recent scan results
@@ -87,20 +153,28 @@ class ClickHouseClient:
             List of scan result dictionaries
         """
         try:
-            query = f"SELECT * FROM scan_results ORDER BY scanned_at DESC LIMIT {limit}"
-            result = self.client.query(query)
-            
-            # Convert result rows to dictionaries
-            columns = result.column_names
-            results = []
-            for row in result.result_rows:
-                results.append(dict(zip(columns, row)))
-            
-            return results
+            return list(self.iter_scan_results(limit))
         except Exception as e:
             print(f"❌ Failed to get scan results: {e}")
             return []
     
+    def iter_scan_results(self, limit: int = 100) -> Iterator[Dict[str, Any]]:
+        """
+        Stream recent scan results one block at a time
+        
+        Args:
+            limit: Maximum number of results to return
+            
+        Yields:
+            Scan result dictionaries
+        """
+        query = "SELECT * FROM scan_results ORDER BY scanned_at DESC LIMIT {limit:UInt32}"
+        with self.client.query_row_block_stream(query, parameters={'limit': limit}) as stream:
+            columns = stream.source.column_names
+            for block in stream:
+                for row in block:
+                    yield dict(zip(columns, row))
+    
     def search_by_email(self, email: str) -> List[Dict[str, Any]]:
         """
         Search for documents containing a specific email
@@ -111,17 +185,16 @@ class ClickHouseClient:
         Returns:
             List of matching documents
         """
+        cached = self._cache_get(('email', email))
+        if cached is not None:
+            return list(cached)
+        
         try:
-            query = f"SELECT * FROM email_index WHERE email = '{email}' ORDER BY scanned_at DESC"
-            result = self.client.query(query)
-            
-            # Convert result rows to dictionaries
-            columns = result.column_names
-            results = []
-            for row in result.result_rows:
-                results.append(dict(zip(columns, row)))
+            query = "SELECT * FROM email_index WHERE email = {email:String} ORDER BY scanned_at DESC"
+            results = list(self.client.query(query, parameters={'email': email}).named_results())
             
-            return results
+            self._cache_put(('email', email), results)
+            return list(results)
         except Exception as e:
             print(f"❌ Failed to search by email: {e}")
             return []
@@ -136,17 +209,16 @@ class ClickHouseClient:
         Returns:
             List of matching documents
         """
+        cached = self._cache_get(('ssn', ssn))
+        if cached is not None:
+            return list(cached)
+        
         try:
-            query = f"SELECT * FROM ssn_index WHERE ssn = '{ssn}' ORDER BY scanned_at DESC"
-            result = self.client.query(query)
+            query = "SELECT * FROM ssn_index WHERE ssn = {ssn:String} ORDER BY scanned_at DESC"
+            results = list(self.client.query(query, parameters={'ssn': ssn}).named_results())
             
-            # Convert result rows to dictionaries
-            columns = result.column_names
-            results = []
-            for row in result.result_rows:
-                results.append(dict(zip(columns, row)))
-            
-            return results
+            self._cache_put(('ssn', ssn), results)
+            return list(results)
         except Exception as e:
             print(f"❌ Failed to search by SSN: {e}")
             return []
@@ -158,26 +230,31 @@ class ClickHouseClient:
         Returns:
             Dictionary with various statistics
         """
+        cached = self._cache_get(('stats',))
+        if cached is not None:
+            return dict(cached)
+        
         try:
-            stats = {}
+            # One round trip for all counters instead of one query each
+            result = self.client.query("""
+                SELECT
+                    count() as total_documents,
+                    (SELECT count() FROM email_index) as total_emails,
+                    (SELECT count() FROM ssn_index) as total_ssns,
+                    avg(scan_duration) as avg_duration
+                FROM scan_results
+            """)
+            row = result.result_rows[0]
             
-            # Total documents scanned
-            result = self.client.query("SELECT count() as total FROM scan_results")
-            stats['total_documents'] = result.result_rows[0][0]
+            stats = {
+                'total_documents': row[0],
+                'total_emails': row[1],
+                'total_ssns': row[2],
+                'avg_scan_duration': row[3] or 0
+            }
             
-            # Total emails found
-            result = self.client.query("SELECT count() as total FROM email_index")
-            stats['total_emails'] = result.result_rows[0][0]
-            
-            # Total SSNs found
-            result = self.client.query("SELECT count() as total FROM ssn_index")
-            stats['total_ssns'] = result.result_rows[0][0]
-            
-            # Average scan duration
-            result = self.client.query("SELECT avg(scan_duration) as avg_duration FROM scan_results")
-            stats['avg_scan_duration'] = result.result_rows[0][0] or 0
-            
-            return stats
+            self._cache_put(('stats',), stats)
+            return dict(stats)
             
         except Exception as e:
             print(f"❌ Failed to get stats: {e}")
@@ -198,10 +275,7 @@ class ClickHouseClient:
             return False
 
 
-# Global client instance
-clickhouse_client = ClickHouseClient()
-
-
+@functools.lru_cache(maxsize=1)
 def get_clickhouse_client() -> ClickHouseClient:
-    """Get the global ClickHouse client instance"""
-    return clickhouse_client 
\ No newline at end of file
+    """Get the shared ClickHouse client instance, connecting on first use"""
+    return ClickHouseClient()
@@ -0,0 +1,29 @@
+"""
+Shared HTTP connection pool settings for the ClickHouse clients
+"""
+import os
+from clickhouse_connect.driver.httputil import get_pool_manager
+
+# Pooled sockets send TCP keepalives well inside the server's idle timeout so
+# they are not silently reaped between requests
+KEEPALIVE_IDLE_SECONDS = 20
+KEEPALIVE_INTERVAL_SECONDS = 10
+CONNECT_TIMEOUT_SECONDS = 5
+
+# Maximum number of pooled HTTP connections shared by concurrent requests
+POOL_SIZE = int(os.getenv('CLICKHOUSE_POOL_SIZE', (os.cpu_count() or 1) * 2))
+
+
+def make_pool_manager():
+    """
+    Create a keepalive connection pool for clickhouse_connect clients
+    
+    Returns:
+        urllib3 PoolManager to pass as pool_mgr to get_client
+    """
+    return get_pool_manager(
+        keep_idle=KEEPALIVE_IDLE_SECONDS,
+        keep_interval=KEEPALIVE_INTERVAL_SECONDS,
+        maxsize=POOL_SIZE,
+        block=False
+    )
@@ -1,47 +1,182 @@
 import clickhouse_connect
+import atexit
+import functools
 import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from models import PDFProcessingResult, UploadHistoryItem, ProcessingStatus, RedactionResult
+from utils import mask_pii_list
 import uuid
+from clickhouse_pool import CONNECT_TIMEOUT_SECONDS, make_pool_manager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, the version check still applies
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+# Server-side limit for read queries so a slow dashboard query cannot tie up
+# a request handler indefinitely
+QUERY_MAX_EXECUTION_SECONDS = int(os.getenv('CLICKHOUSE_MAX_EXECUTION_TIME', 5))
+
+# Column order of the pdf_uploads table, used for batched inserts
+PDF_UPLOAD_COLUMNS = (
+    'upload_id',
+    'filename',
+    'file_path',
+    'file_size',
+    'upload_date',
+    'processing_date',
+    'status',
+    'pages_processed',
+    'text_length',
+    'processing_time',
+    'emails',
+    'ssns',
+    'error_message',
+    'redaction_applied',
+    'redacted_file_available',
+    'total_redactions',
+    'redacted_file_path'
+)
+
+# Let the server buffer small inserts into larger parts instead of creating a
+# new part per flush; the flusher does not wait for the buffer to be written.
+# Set CLICKHOUSE_ASYNC_INSERT=0 (e.g. in tests) for synchronous inserts that are
+# visible as soon as flush() returns.
+ASYNC_INSERT_ENABLED = os.getenv('CLICKHOUSE_ASYNC_INSERT', '1') == '1'
+ASYNC_INSERT_SETTINGS = {
+    'async_insert': 1,
+    'wait_for_async_insert': 0,
+    'async_insert_max_data_size': 10_485_760,
+    'async_insert_busy_timeout_ms': 200
+}
+
+# Pending rows are flushed once either threshold is reached
+BATCH_MAX_ROWS = 1000
+BATCH_MAX_DELAY_SECONDS = 1.0
+
+# Rows from a failed flush are queued again for the next one; while ClickHouse
+# stays unreachable the oldest rows beyond this many are dropped
+PENDING_MAX_ROWS = BATCH_MAX_ROWS * 10
+
+# Bump whenever the DDL in init_tables changes; tables are only rebuilt when
+# the version recorded in ClickHouse differs from this one
+SCHEMA_VERSION = 7
+
+# Serializes init_tables across uvicorn workers on the same host
+INIT_LOCK_PATH = os.path.join(tempfile.gettempdir(), 'pdf_scan_clickhouse_init.lock')
+
+# Size of the recent uploads list and the trends window on the metrics page
+RECENT_UPLOADS_LIMIT = 10
+TRENDS_DAYS = 7
+
+# Independent findings queries are issued side by side on pooled connections
+FINDINGS_QUERY_WORKERS = 2
+
+# Plain dict lookup is cheaper than ProcessingStatus(value) per row
+_STATUS_BY_VALUE = {status.value: status for status in ProcessingStatus}
+
+# Dashboard statistics and findings are served from memory for this long
+STATS_CACHE_TTL_SECONDS = 5.0
+
 class ClickHouseService:
     def __init__(self):
         self.client = None
+        self._write_client = None
+        self._pending_rows = deque()
+        self._pending_lock = threading.Lock()
+        self._insert_lock = threading.Lock()
+        self._insert_context = None
+        self._flush_event = threading.Event()
+        self._flusher = None
+        self._stats_cache = (0.0, None)
+        self._findings_cache = (0.0, None)
+        self._query_pool = ThreadPoolExecutor(
+            max_workers=FINDINGS_QUERY_WORKERS,
+            thread_name_prefix='clickhouse-query'
+        )
         self.connect()
-        self.init_tables()
+        self._start_flusher()
+    
+    def _create_client(self, pool_mgr, **kwargs):
+        """Create a ClickHouse client on the shared connection pool"""
+        return clickhouse_connect.get_client(
+            host='localhost',
+            port=8123,
+            username='app',
+            password='secret',
+            database='pdf_scan',
+            # Pooled connections and no shared session let concurrent
+            # requests run their queries in parallel on one client
+            pool_mgr=pool_mgr,
+            autogenerate_session_id=False,
+            connect_timeout=CONNECT_TIMEOUT_SECONDS,
+            **kwargs
+        )
     
     def connect(self):
         """Connect to ClickHouse database"""
         try:
-            self.client = clickhouse_connect.get_client(
-                host='localhost',
-                port=8123,
-                username='app',
-                password='secret',
-                database='pdf_scan'
+            pool_mgr = make_pool_manager()
+            # Query results (history, lookups) are compressed on the wire
+            self.client = self._create_client(
+                pool_mgr,
+                compress='lz4',
+                settings={'max_execution_time': QUERY_MAX_EXECUTION_SECONDS}
+            )
+            # Inserts get their own client so the async insert settings
+            # never apply to reads or DDL; the small batches are not worth
+            # compressing
+            self._write_client = self._create_client(
+                pool_mgr,
+                compress=False,
+                settings=ASYNC_INSERT_SETTINGS if ASYNC_INSERT_ENABLED else None
             )
             logger.info("Connected to ClickHouse database")
         except Exception as e:
-            logger.error(f"Failed to connect to ClickHouse: {e}")
+            logger.error("Failed to connect to ClickHouse: %s", e)
             # For now, we'll continue without ClickHouse
             self.client = None
+            self._write_client = None
+    
+    def _get_schema_version(self) -> int:
+        """Return the schema version recorded in ClickHouse, or 0 if none"""
+        try:
+            result = self.client.query("SELECT max(v) FROM _schema_version")
+            return result.result_rows[0][0] or 0
+        except Exception:
+            return 0
     
     def init_tables(self):
-        """Initialize ClickHouse tables if they don't exist"""
+        """Initialize ClickHouse tables unless they already match SCHEMA_VERSION"""
         if not self.client:
             return
+        
+        if self._get_schema_version() == SCHEMA_VERSION:
+            logger.info("ClickHouse schema is up to date (version %s)", SCHEMA_VERSION)
+            return
             
         try:
+            # Column types are about to change, describe the table again on next insert
+            self._insert_context = None
+            
             # Drop existing table if it exists (to update schema)
             try:
                 self.client.command("DROP TABLE IF EXISTS pdf_uploads")
                 self.client.command("DROP TABLE IF EXISTS email_index")
                 self.client.command("DROP TABLE IF EXISTS ssn_index")
+                self.client.command("DROP TABLE IF EXISTS stats_rollup")
+                self.client.command("DROP TABLE IF EXISTS findings_rollup")
             except Exception as e:
-                logger.warning(f"Could not drop existing tables: {e}")
+                logger.warning("Could not drop existing tables: %s", e)
             
             # Create PDF uploads table with redaction fields
             self.client.command("""
@@ -52,56 +187,150 @@ class ClickHouseService:
                     file_size UInt64,
                     upload_date DateTime,
                     processing_date Nullable(DateTime),
-                    status String,
+                    status LowCardinality(String),
                     pages_processed UInt32,
                     text_length UInt32,
                     processing_time Float32,
                     emails Array(String),
                     ssns Array(String),
+                    -- Computed once at insert so scans and aggregates read a
+                    -- small integer column instead of the arrays
+                    email_count UInt32 MATERIALIZED length(emails),
+                    ssn_count UInt32 MATERIALIZED length(ssns),
+                    is_clean UInt8 MATERIALIZED email_count = 0 AND ssn_count = 0,
                     error_message Nullable(String),
                     redaction_applied UInt8 DEFAULT 0,
                     redacted_file_available UInt8 DEFAULT 0,
                     total_redactions UInt32 DEFAULT 0,
-                    redacted_file_path Nullable(String)
+                    redacted_file_path Nullable(String),
+                    -- upload_id is no longer a key prefix, keep point lookups cheap
+                    INDEX idx_upload_id upload_id TYPE bloom_filter GRANULARITY 4
                 ) ENGINE = MergeTree()
-                ORDER BY (upload_id, upload_date)
+                -- Date-leading key and monthly partitions let time-window
+                -- queries prune parts and granules, and newest-first reads
+                -- follow the sort order
+                PARTITION BY toYYYYMM(upload_date)
+                ORDER BY (upload_date, upload_id)
             """)
             
-            # Create materialized view for email index
+            # Running totals for the statistics endpoint, collapsed into a
+            # single row by background merges
             self.client.command("""
-                CREATE MATERIALIZED VIEW IF NOT EXISTS email_index
-                ENGINE = MergeTree()
-                ORDER BY (email, upload_date)
+                CREATE MATERIALIZED VIEW IF NOT EXISTS stats_rollup
+                ENGINE = SummingMergeTree()
+                ORDER BY tuple()
+                POPULATE
                 AS SELECT
-                    upload_id,
-                    upload_date,
-                    email,
-                    filename
+                    count() as total_uploads,
+                    countIf(is_clean) as clean_pdfs,
+                    countIf(NOT is_clean) as pii_pdfs,
+                    sum(email_count) as total_emails,
+                    sum(ssn_count) as total_ssns,
+                    sum(processing_time) as total_processing_time
                 FROM pdf_uploads
-                ARRAY JOIN emails AS email
+                WHERE status = 'complete'
             """)
             
-            # Create materialized view for SSN index
+            # Aggregate states behind the findings metrics, covering every
+            # status, merged at read time instead of scanning pdf_uploads
             self.client.command("""
-                CREATE MATERIALIZED VIEW IF NOT EXISTS ssn_index
-                ENGINE = MergeTree()
-                ORDER BY (ssn, upload_date)
+                CREATE MATERIALIZED VIEW IF NOT EXISTS findings_rollup
+                ENGINE = AggregatingMergeTree()
+                ORDER BY tuple()
+                POPULATE
                 AS SELECT
-                    upload_id,
-                    upload_date,
-                    ssn,
-                    filename
+                    countState() as total_pdfs,
+                    sumState(toUInt64(email_count + ssn_count)) as total_pii_items,
+                    countIfState(status = 'complete') as successful_uploads,
+                    avgState(processing_time) as avg_processing_time,
+                    sumState(toUInt64(email_count)) as total_emails,
+                    sumState(toUInt64(ssn_count)) as total_ssns,
+                    quantileTDigestIfState(0.95)(processing_time, processing_time > 0) as p95_processing_time
                 FROM pdf_uploads
-                ARRAY JOIN ssns AS ssn
             """)
             
+            # Record the version last so a failed migration is retried
+            self.client.command("""
+                CREATE TABLE IF NOT EXISTS _schema_version (v UInt32)
+                ENGINE = TinyLog
+            """)
+            self.client.insert("_schema_version", [[SCHEMA_VERSION]], column_names=['v'])
+            
             logger.info("ClickHouse tables initialized successfully")
             
         except Exception as e:
-            logger.error(f"Failed to initialize ClickHouse tables: {e}")
+            logger.error("Failed to initialize ClickHouse tables: %s", e)
+    
+    def init_tables_once(self):
+        """Run init_tables while holding a host-wide lock so only one worker migrates"""
+        with open(INIT_LOCK_PATH, 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Workers that waited on the lock find the version current and skip
+                self.init_tables()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _start_flusher(self):
+        """Start the background thread that writes pending rows in batches"""
+        if not self.client or self._flusher:
+            return
+        
+        self._flusher = threading.Thread(
+            target=self._flush_loop,
+            name="clickhouse-flusher",
+            daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.flush)
+    
+    def _flush_loop(self):
+        """Flush pending rows every BATCH_MAX_DELAY_SECONDS or when the batch is full"""
+        while True:
+            self._flush_event.wait(BATCH_MAX_DELAY_SECONDS)
+            self._flush_event.clear()
+            self.flush()
+    
+    def flush(self) -> bool:
+        """Write all pending upload rows to ClickHouse in a single insert"""
+        with self._pending_lock:
+            if not self._pending_rows:
+                return True
+            rows = list(self._pending_rows)
+            self._pending_rows.clear()
+        
+        try:
+            with self._insert_lock:
+                # Reusing the insert context skips the DESCRIBE TABLE round
+                # trip clickhouse-connect otherwise makes before every insert
+                if self._insert_context is None:
+                    self._insert_context = self._write_client.create_insert_context(
+                        "pdf_uploads", column_names=PDF_UPLOAD_COLUMNS
+                    )
+                self._insert_context.data = rows
+                self._write_client.insert(context=self._insert_context)
+            self._stats_cache = (0.0, None)
+            self._findings_cache = (0.0, None)
+            logger.debug("Flushed %d upload results to ClickHouse", len(rows))
+            return True
+        except Exception as e:
+            logger.error("Failed to flush %s upload results, will retry: %s", len(rows), e)
+            # The context may describe a table that has since changed
+            self._insert_context = None
+            with self._pending_lock:
+                # Put the batch back ahead of anything queued since it was taken
+                self._pending_rows.extendleft(reversed(rows))
+                dropped = len(self._pending_rows) - PENDING_MAX_ROWS
+                for _ in range(max(0, dropped)):
+                    self._pending_rows.popleft()
+            if dropped > 0:
+                logger.error("Dropped %s oldest upload results, pending queue is full", dropped)
+            return False
     
     def store_upload_result(self, result: PDFProcessingResult) -> bool:
-        """Store PDF processing result in ClickHouse"""
+        """Queue PDF processing result for the next batched insert into ClickHouse"""
         if not self.client:
             logger.warning("ClickHouse not available, skipping storage")
             return False
@@ -110,67 +339,52 @@ class ClickHouseService:
             # Prepare redaction data
             redaction_applied = 0
             redacted_file_available = 0
-            total_redactions = 0
             redacted_file_path = None
             
             if result.redaction_result:
                 redaction_applied = 1
                 redacted_file_available = 1 if result.redaction_result.redacted_file_path else 0
-                total_redactions = result.redaction_result.redaction_summary.get('total_redactions', 0)
                 redacted_file_path = result.redaction_result.redacted_file_path
             
-            insert_data = {
-                'upload_id': result.upload_id,
-                'filename': result.filename,
-                'file_path': result.file_path,
-                'file_size': result.file_size,
-                'upload_date': result.upload_date,
-                'processing_date': result.processing_date,
-                'status': result.status.value,
-                'pages_processed': result.pages_processed,
-                'text_length': result.text_length,
-                'processing_time': result.processing_time,
-                'emails': result.emails,
-                'ssns': result.ssns,
-                'error_message': result.error_message,
-                'redaction_applied': redaction_applied,
-                'redacted_file_available': redacted_file_available,
-                'total_redactions': total_redactions,
-                'redacted_file_path': redacted_file_path
-            }
+            # Row values in PDF_UPLOAD_COLUMNS order
+            values = (
+                result.upload_id,
+                result.filename,
+                result.file_path,
+                result.file_size,
+                result.upload_date,
+                result.processing_date,
+                result.status.value,
+                result.pages_processed,
+                result.text_length,
+                result.processing_time,
+                result.emails,
+                result.ssns,
+                result.error_message,
+                redaction_applied,
+                redacted_file_available,
+                result.total_redactions,
+                redacted_file_path
+            )
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Inserting upload %s (%d emails, %d ssns)",
+                             result.upload_id, len(result.emails), len(result.ssns))
+            
+            with self._pending_lock:
+                self._pending_rows.append(values)
+                batch_full = len(self._pending_rows) >= BATCH_MAX_ROWS
+            
+            if batch_full:
+                self._flush_event.set()
             
-            logger.info(f"Attempting to insert data: {insert_data}")
-            
-            # Convert to list of values in the correct order
-            values = [
-                insert_data['upload_id'],
-                insert_data['filename'],
-                insert_data['file_path'],
-                insert_data['file_size'],
-                insert_data['upload_date'],
-                insert_data['processing_date'],
-                insert_data['status'],
-                insert_data['pages_processed'],
-                insert_data['text_length'],
-                insert_data['processing_time'],
-                insert_data['emails'],
-                insert_data['ssns'],
-                insert_data['error_message'],
-                insert_data['redaction_applied'],
-                insert_data['redacted_file_available'],
-                insert_data['total_redactions'],
-                insert_data['redacted_file_path']
-            ]
-            
-            self.client.insert("pdf_uploads", [values])
-            
-            logger.info(f"Stored upload result for {result.filename}")
+            logger.info("Queued upload result for %s", result.filename)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to store upload result: {e}")
-            logger.error(f"Error type: {type(e)}")
-            logger.error(f"Error details: {str(e)}")
+            logger.error("Failed to store upload result: %s", e)
+            logger.error("Error type: %s", type(e))
+            logger.error("Error details: %s", e)
             return False
     
     def get_upload_history(self, limit: int = 50) -> List[UploadHistoryItem]:
@@ -180,65 +394,77 @@ class ClickHouseService:
             return []
             
         try:
-            query = f"""
-                SELECT 
-                    upload_id,
-                    filename,
-                    upload_date,
-                    status,
-                    file_size,
-                    pages_processed,
-                    length(emails) as email_count,
-                    length(ssns) as ssn_count,
-                    processing_time,
-                    emails,
-                    ssns,
-                    redaction_applied,
-                    redacted_file_available,
-                    total_redactions
-                FROM pdf_uploads
-                ORDER BY upload_date DESC
-                LIMIT {limit}
-            """
-            
-            result = self.client.query(query)
-            
-            history = []
-            for row in result.result_rows:
-                # Import masking functions
-                from main import mask_pii_list
-                
-                history.append(UploadHistoryItem(
-                    upload_id=row[0],
-                    filename=row[1],
-                    upload_date=row[2],
-                    status=ProcessingStatus(row[3]),
-                    file_size=row[4],
-                    pages_processed=row[5],
-                    email_count=row[6],
-                    ssn_count=row[7],
-                    processing_time=row[8],
-                    is_clean=(row[6] == 0 and row[7] == 0),
-                    emails=mask_pii_list(row[9] or []),
-                    ssns=mask_pii_list(row[10] or []),
-                    redaction_applied=bool(row[11]),
-                    redacted_file_available=bool(row[12]),
-                    total_redactions=row[13]
-                ))
-            
-            return history
+            return [item for block in self.iter_upload_history_blocks(limit) for item in block]
             
         except Exception as e:
-            logger.error(f"Failed to get upload history: {e}")
+            logger.error("Failed to get upload history: %s", e)
             return []
     
+    def iter_upload_history_blocks(self, limit: int = 50) -> Iterator[List[UploadHistoryItem]]:
+        """Stream upload history from ClickHouse, one list of items per block"""
+        if not self.client:
+            return
+        
+        query = """
+            SELECT 
+                upload_id,
+                filename,
+                upload_date,
+                status,
+                file_size,
+                pages_processed,
+                email_count,
+                ssn_count,
+                processing_time,
+                emails,
+                ssns,
+                redaction_applied,
+                redacted_file_available,
+                total_redactions,
+                is_clean
+            FROM pdf_uploads
+            ORDER BY upload_date DESC
+            LIMIT {limit:UInt32}
+        """
+        
+        # Only one block is held in memory at a time, and it arrives as
+        # parallel column lists so no per-row tuples are built
+        with self.client.query_column_block_stream(query, parameters={'limit': limit}) as stream:
+            for columns in stream:
+                (upload_ids, filenames, upload_dates, statuses, file_sizes,
+                 pages_processed, email_counts, ssn_counts, processing_times,
+                 emails, ssns, redaction_applied, redacted_file_available,
+                 total_redactions, is_clean) = columns
+                
+                # Rows come from our own typed schema, so skip per-field validation
+                yield [
+                    UploadHistoryItem.model_construct(
+                        upload_id=upload_ids[i],
+                        filename=filenames[i],
+                        upload_date=upload_dates[i],
+                        status=_STATUS_BY_VALUE[statuses[i]],
+                        file_size=file_sizes[i],
+                        pages_processed=pages_processed[i],
+                        email_count=email_counts[i],
+                        ssn_count=ssn_counts[i],
+                        processing_time=processing_times[i],
+                        is_clean=bool(is_clean[i]),
+                        emails=mask_pii_list(emails[i] or []),
+                        ssns=mask_pii_list(ssns[i] or []),
+                        redaction_applied=bool(redaction_applied[i]),
+                        redacted_file_available=bool(redacted_file_available[i]),
+                        total_redactions=total_redactions[i]
+                    )
+                    for i in range(len(upload_ids))
+                ]
+    
     def get_upload_by_id(self, upload_id: str) -> Optional[PDFProcessingResult]:
         """Get specific upload by ID"""
         if not self.client:
             return None
             
         try:
-            query = f"""
+            query = """
                 SELECT 
                     upload_id, filename, file_path, file_size, upload_date,
                     processing_date, status, pages_processed, text_length,
@@ -246,17 +472,17 @@ class ClickHouseService:
                     redaction_applied, redacted_file_available, total_redactions,
                     redacted_file_path
                 FROM pdf_uploads
-                WHERE upload_id = '{upload_id}'
+                WHERE upload_id = {upload_id:String}
             """
             
-            result = self.client.query(query)
+            result = self.client.query(query, parameters={'upload_id': upload_id})
             
             if result.result_rows:
                 row = result.result_rows[0]
                 # Create redaction result if redaction was applied
                 redaction_result = None
                 if row[13]:  # redaction_applied
-                    redaction_result = RedactionResult(
+                    redaction_result = RedactionResult.model_construct(
                         upload_id=row[0],
                         original_file_path=row[2],
                         redacted_file_path=row[16],  # redacted_file_path
@@ -269,14 +495,15 @@ class ClickHouseService:
                         redaction_time=None
                     )
                 
-                return PDFProcessingResult(
+                # Trusted row from our own schema, no need to validate it again
+                return PDFProcessingResult.model_construct(
                     upload_id=row[0],
                     filename=row[1],
                     file_path=row[2],
                     file_size=row[3],
                     upload_date=row[4],
                     processing_date=row[5],
-                    status=ProcessingStatus(row[6]),
+                    status=_STATUS_BY_VALUE[row[6]],
                     pages_processed=row[7],
                     text_length=row[8],
                     processing_time=row[9],
@@ -284,13 +511,14 @@ class ClickHouseService:
                     ssns=row[11],
                     error_message=row[12],
                     redaction_result=redaction_result,
-                    pii_locations=[]
+                    pii_locations=[],
+                    total_redactions=row[15]
                 )
             
             return None
             
         except Exception as e:
-            logger.error(f"Failed to get upload by ID: {e}")
+            logger.error("Failed to get upload by ID: %s", e)
             return None
     
     def get_statistics(self) -> dict:
@@ -304,38 +532,43 @@ class ClickHouseService:
                 "total_ssns": 0,
                 "avg_processing_time": 0.0
             }
+        
+        cached_at, cached_stats = self._stats_cache
+        if cached_stats is not None and time.monotonic() - cached_at < STATS_CACHE_TTL_SECONDS:
+            return dict(cached_stats)
             
         try:
+            # Unmerged parts may still hold several partial rows, so sum them
             query = """
                 SELECT 
-                    count() as total_uploads,
-                    countIf(length(emails) = 0 AND length(ssns) = 0) as clean_pdfs,
-                    countIf(length(emails) > 0 OR length(ssns) > 0) as pii_pdfs,
-                    sum(length(emails)) as total_emails,
-                    sum(length(ssns)) as total_ssns,
-                    avg(processing_time) as avg_processing_time
-                FROM pdf_uploads
-                WHERE status = 'complete'
+                    sum(total_uploads) as total_uploads,
+                    sum(clean_pdfs) as clean_pdfs,
+                    sum(pii_pdfs) as pii_pdfs,
+                    sum(total_emails) as total_emails,
+                    sum(total_ssns) as total_ssns,
+                    sum(total_processing_time) as total_processing_time
+                FROM stats_rollup
             """
             
             result = self.client.query(query)
             row = result.result_rows[0]
             
-            # Handle NaN values from ClickHouse aggregations
-            avg_processing_time_raw = row[5]
-            avg_processing_time = 0.0 if avg_processing_time_raw is None or str(avg_processing_time_raw) == 'nan' else float(avg_processing_time_raw)
+            total_uploads = row[0] or 0
+            avg_processing_time = float(row[5]) / total_uploads if total_uploads > 0 else 0.0
             
-            return {
-                "total_uploads": row[0],
-                "clean_pdfs": row[1],
-                "pii_pdfs": row[2],
-                "total_emails": row[3],
-                "total_ssns": row[4],
+            stats = {
+                "total_uploads": total_uploads,
+                "clean_pdfs": row[1] or 0,
+                "pii_pdfs": row[2] or 0,
+                "total_emails": row[3] or 0,
+                "total_ssns": row[4] or 0,
                 "avg_processing_time": avg_processing_time
             }
+            self._stats_cache = (time.monotonic(), stats)
+            return dict(stats)
             
         except Exception as e:
-            logger.error(f"Failed to get statistics: {e}")
+            logger.error("Failed to get statistics: %s", e)
             return {
                 "total_uploads": 0,
                 "clean_pdfs": 0,
@@ -358,28 +591,69 @@ class ClickHouseService:
                 "processing_trends": [],
                 "recent_uploads": []
             }
+        
+        cached_at, cached_findings = self._findings_cache
+        if cached_findings is not None and time.monotonic() - cached_at < STATS_CACHE_TTL_SECONDS:
+            return dict(cached_findings)
             
         try:
-            # Get basic metrics
+            # Get basic metrics and P95 processing time from the pre-aggregated
+            # states rather than scanning pdf_uploads
             metrics_query = """
                 SELECT 
-                    COUNT(*) as total_pdfs,
-                    SUM(length(emails) + length(ssns)) as total_pii_items,
-                    COUNT(CASE WHEN status = 'complete' THEN 1 END) as successful_uploads,
-                    AVG(processing_time) as avg_processing_time,
-                    SUM(length(emails)) as total_emails,
-                    SUM(length(ssns)) as total_ssns
+                    countMerge(total_pdfs),
+                    sumMerge(total_pii_items),
+                    countIfMerge(successful_uploads),
+                    avgMerge(avg_processing_time),
+                    sumMerge(total_emails),
+                    sumMerge(total_ssns),
+                    quantileTDigestIfMerge(0.95)(p95_processing_time)
+                FROM findings_rollup
+            """
+            
+            # Get recent uploads (last RECENT_UPLOADS_LIMIT)
+            recent_query = """
+                SELECT 
+                    upload_id,
+                    filename,
+                    upload_date,
+                    status,
+                    email_count,
+                    ssn_count,
+                    processing_time
                 FROM pdf_uploads
+                ORDER BY upload_date DESC
+                LIMIT {limit:UInt32}
             """
             
-            # Get P95 processing time
-            p95_query = """
+            # Get processing trends (last TRENDS_DAYS days)
+            trends_query = """
                 SELECT 
-                    quantile(0.95)(processing_time) as p95_processing_time
+                    toDate(upload_date) as date,
+                    COUNT(*) as uploads,
+                    AVG(processing_time) as avg_time
                 FROM pdf_uploads
-                WHERE processing_time > 0
+                WHERE upload_date >= toStartOfDay(now()) - INTERVAL {days:UInt32} DAY
+                GROUP BY toDate(upload_date)
+                ORDER BY date DESC
             """
             
+            # The recent and trends queries do not depend on the metrics, so
+            # they run on other pooled connections while the metrics query does
+            # Column-oriented results skip the row transpose in the driver
+            recent_future = self._query_pool.submit(
+                self.client.query,
+                recent_query,
+                parameters={'limit': RECENT_UPLOADS_LIMIT},
+                column_oriented=True
+            )
+            trends_future = self._query_pool.submit(
+                self.client.query,
+                trends_query,
+                parameters={'days': TRENDS_DAYS},
+                column_oriented=True
+            )
+            
             result = self.client.query(metrics_query)
             row = result.result_rows[0]
             
@@ -393,70 +667,44 @@ class ClickHouseService:
             total_emails = row[4] or 0
             total_ssns = row[5] or 0
             
-            # Get P95 processing time
-            p95_result = self.client.query(p95_query)
-            p95_raw = p95_result.result_rows[0][0]
+            p95_raw = row[6]
             p95_processing_time = 0.0 if p95_raw is None or str(p95_raw) == 'nan' else float(p95_raw)
             
             # Calculate success rate
             success_rate = (successful_uploads / total_pdfs * 100) if total_pdfs > 0 else 0
             
-            # Get recent uploads (last 10)
-            recent_query = """
-                SELECT 
-                    upload_id,
-                    filename,
-                    upload_date,
-                    status,
-                    length(emails) as email_count,
-                    length(ssns) as ssn_count,
-                    processing_time
-                FROM pdf_uploads
-                ORDER BY upload_date DESC
-                LIMIT 10
-            """
-            
-            recent_result = self.client.query(recent_query)
+            recent_result = recent_future.result()
+            (upload_ids, filenames, upload_dates, statuses,
+             email_counts, ssn_counts, processing_times) = recent_result.result_columns or ([],) * 7
             recent_uploads = []
-            for row in recent_result.result_rows:
-                processing_time_raw = row[6]
+            for i in range(len(upload_ids)):
+                processing_time_raw = processing_times[i]
                 processing_time = 0.0 if processing_time_raw is None or str(processing_time_raw) == 'nan' else float(processing_time_raw)
                 
                 recent_uploads.append({
-                    "upload_id": row[0],
-                    "filename": row[1],
-                    "upload_date": row[2].isoformat() if row[2] else None,
-                    "status": row[3],
-                    "email_count": row[4] or 0,
-                    "ssn_count": row[5] or 0,
+                    "upload_id": upload_ids[i],
+                    "filename": filenames[i],
+                    "upload_date": upload_dates[i].isoformat() if upload_dates[i] else None,
+                    "status": statuses[i],
+                    "email_count": email_counts[i] or 0,
+                    "ssn_count": ssn_counts[i] or 0,
                     "processing_time": processing_time
                 })
             
-            # Get processing trends (last 7 days)
-            trends_query = """
-                SELECT 
-                    toDate(upload_date) as date,
-                    COUNT(*) as uploads,
-                    AVG(processing_time) as avg_time
-                FROM pdf_uploads
-                WHERE upload_date >= now() - INTERVAL 7 DAY
-                GROUP BY toDate(upload_date)
-                ORDER BY date DESC
-            """
-            
-            trends_result = self.client.query(trends_query)
+            trends_result = trends_future.result()
+            dates, uploads, avg_times = trends_result.result_columns or ([],) * 3
             processing_trends = []
-            for row in trends_result.result_rows:
-                avg_time_raw = row[2]
+            for i in range(len(dates)):
+                avg_time_raw = avg_times[i]
                 avg_time = 0.0 if avg_time_raw is None or str(avg_time_raw) == 'nan' else float(avg_time_raw)
                 
                 processing_trends.append({
-                    "date": row[0].isoformat() if row[0] else None,
-                    "uploads": row[1] or 0,
+                    "date": dates[i].isoformat() if dates[i] else None,
+                    "uploads": uploads[i] or 0,
                     "avg_time": avg_time
                 })
             
-            return {
+            findings = {
                 "total_pdfs_processed": total_pdfs,
                 "total_pii_items": total_pii_items,
                 "success_rate": round(success_rate, 1),
@@ -469,9 +717,11 @@ class ClickHouseService:
                 "processing_trends": processing_trends,
                 "recent_uploads": recent_uploads
             }
+            self._findings_cache = (time.monotonic(), findings)
+            return dict(findings)
             
         except Exception as e:
-            logger.error(f"Failed to get findings: {e}")
+            logger.error("Failed to get findings: %s", e)
             return {
                 "total_pdfs_processed": 0,
                 "total_pii_items": 0,
@@ -483,5 +733,13 @@ class ClickHouseService:
                 "recent_uploads": []
             }
 
-# Global ClickHouse service instance
-clickhouse_service = ClickHouseService() 
\ No newline at end of file
+@functools.lru_cache(maxsize=1)
+def get_clickhouse_service() -> ClickHouseService:
+    """Get the shared ClickHouse service, connecting on first use"""
+    return ClickHouseService()
+
+
+if __name__ == "__main__":
+    # Create or migrate the schema without starting the web server
+    logging.basicConfig(level=logging.INFO)
+    get_clickhouse_service().init_tables_once()
@@ -4,18 +4,34 @@ from pathlib import Path
 from datetime import datetime
 import uuid
 import logging
+from typing import Optional
+from utils import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# Uploads are copied to disk in blocks of this size instead of held in memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Number of upload_id -> redacted file path entries kept for downloads
+REDACTED_PATH_CACHE_SIZE = 1024
+
+class UploadTooLargeError(Exception):
+    """Raised when an uploaded file is larger than the allowed size"""
+
 class FileStorageService:
     def __init__(self, upload_dir: str = "uploads"):
         self.upload_dir = Path(upload_dir)
         self.upload_dir.mkdir(exist_ok=True)
-        logger.info(f"File storage initialized at: {self.upload_dir.absolute()}")
+        
+        # Recently produced redacted files, so repeat downloads need neither a
+        # ClickHouse lookup nor a stat call
+        self._redacted_paths = LRUCache(REDACTED_PATH_CACHE_SIZE)
+        
+        logger.info("File storage initialized at: %s", self.upload_dir.absolute())
     
-    def save_uploaded_file(self, file_content: bytes, original_filename: str) -> tuple[str, str]:
+    def create_upload_path(self, original_filename: str) -> tuple[str, str]:
         """
-        Save uploaded file to storage
+        Allocate a new upload ID and the path its file should be written to
         
         Returns:
             Tuple of (upload_id, file_path)
@@ -28,12 +44,70 @@ class FileStorageService:
         upload_path.mkdir(exist_ok=True)
         
         # Save file with original name
-        file_path = upload_path / original_filename
+        return upload_id, str(upload_path / original_filename)
+    
+    def save_uploaded_file(self, file_content: bytes, original_filename: str) -> tuple[str, str]:
+        """
+        Save uploaded file to storage
+        
+        Returns:
+            Tuple of (upload_id, file_path)
+        """
+        upload_id, file_path = self.create_upload_path(original_filename)
         with open(file_path, 'wb') as f:
             f.write(file_content)
         
-        logger.info(f"Saved uploaded file: {file_path}")
-        return upload_id, str(file_path)
+        logger.info("Saved uploaded file: %s", file_path)
+        return upload_id, file_path
+    
+    def save_uploaded_stream(self, src_fileobj, original_filename: str,
+                             max_bytes: Optional[int] = None) -> tuple[str, str, int]:
+        """
+        Save an uploaded file from a binary stream without reading it into memory
+        
+        Returns:
+            Tuple of (upload_id, file_path, file_size)
+        
+        Raises:
+            UploadTooLargeError: If the stream is longer than max_bytes
+        """
+        upload_id, file_path = self.create_upload_path(original_filename)
+        too_large = False
+        with open(file_path, 'wb') as f:
+            while True:
+                chunk = src_fileobj.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if max_bytes is not None and f.tell() + len(chunk) > max_bytes:
+                    too_large = True
+                    break
+                f.write(chunk)
+            file_size = f.tell()
+        
+        if too_large:
+            shutil.rmtree(Path(file_path).parent, ignore_errors=True)
+            raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+        
+        logger.info("Saved uploaded file: %s", file_path)
+        return upload_id, file_path, file_size
+    
+    def remember_redacted_file(self, upload_id: str, file_path: str):
+        """Cache the location of the redacted file written for an upload"""
+        self._redacted_paths.put(upload_id, file_path)
+    
+    def get_cached_redacted_file(self, upload_id: str) -> Optional[str]:
+        """Get the cached redacted file path for an upload, if it still exists"""
+        file_path = self._redacted_paths.get(upload_id)
+        if file_path is not None and not os.path.exists(file_path):
+            # Removed behind our back (cleanup job, another worker); let the
+            # caller fall back to the ClickHouse lookup
+            self._forget_redacted_file(upload_id)
+            return None
+        return file_path
+    
+    def _forget_redacted_file(self, upload_id: str):
+        """Drop an upload from the redacted file path cache"""
+        self._redacted_paths.pop(upload_id)
     
     def get_file_path(self, upload_id: str, filename: str) -> str:
         """Get the full path to a stored file"""
@@ -57,11 +131,13 @@ class FileStorageService:
             file_path = self.upload_dir / upload_id / filename
             if file_path.exists():
                 file_path.unlink()
-                logger.info(f"Deleted file: {file_path}")
+                if self.get_cached_redacted_file(upload_id) == str(file_path):
+                    self._forget_redacted_file(upload_id)
+                logger.info("Deleted file: %s", file_path)
                 return True
             return False
         except Exception as e:
-            logger.error(f"Failed to delete file {filename}: {e}")
+            logger.error("Failed to delete file %s: %s", filename, e)
             return False
     
     def delete_upload_directory(self, upload_id: str) -> bool:
@@ -70,40 +146,48 @@ class FileStorageService:
             upload_path = self.upload_dir / upload_id
             if upload_path.exists():
                 shutil.rmtree(upload_path)
-                logger.info(f"Deleted upload directory: {upload_path}")
+                self._forget_redacted_file(upload_id)
+                logger.info("Deleted upload directory: %s", upload_path)
                 return True
             return False
         except Exception as e:
-            logger.error(f"Failed to delete upload directory {upload_id}: {e}")
+            logger.error("Failed to delete upload directory %s: %s", upload_id, e)
             return False
     
     def get_storage_stats(self) -> dict:
         """Get storage statistics"""
+        total_files = 0
+        total_size = 0
+        upload_directories = 0
+        
         try:
-            total_files = 0
-            total_size = 0
-            
-            for upload_dir in self.upload_dir.iterdir():
-                if upload_dir.is_dir():
-                    for file_path in upload_dir.iterdir():
-                        if file_path.is_file():
-                            total_files += 1
-                            total_size += file_path.stat().st_size
-            
-            return {
-                "total_files": total_files,
-                "total_size_bytes": total_size,
-                "total_size_mb": round(total_size / (1024 * 1024), 2),
-                "upload_directories": len([d for d in self.upload_dir.iterdir() if d.is_dir()])
-            }
+            # One scandir pass; DirEntry type checks come from the directory
+            # listing itself and no Path objects are built per file
+            with os.scandir(self.upload_dir) as upload_dirs:
+                for upload_dir in upload_dirs:
+                    if not upload_dir.is_dir(follow_symlinks=False):
+                        continue
+                    upload_directories += 1
+                    with os.scandir(upload_dir.path) as entries:
+                        for entry in entries:
+                            if entry.is_file(follow_symlinks=False):
+                                total_files += 1
+                                total_size += entry.stat(follow_symlinks=False).st_size
         except Exception as e:
-            logger.error(f"Failed to get storage stats: {e}")
+            logger.error("Failed to get storage stats: %s", e)
             return {
                 "total_files": 0,
                 "total_size_bytes": 0,
                 "total_size_mb": 0,
                 "upload_directories": 0
             }
+        
+        return {
+            "total_files": total_files,
+            "total_size_bytes": total_size,
+            "total_size_mb": round(total_size / (1024 * 1024), 2),
+            "upload_directories": upload_directories
+        }
 
 # Global file storage service instance
 file_storage = FileStorageService() 
\ No newline at end of file
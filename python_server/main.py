@@ -1,42 +1,67 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, Response
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, Request, Response
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 import uvicorn
+import asyncio
+import orjson
 import logging
-import tempfile
+import multiprocessing
 import os
 from pathlib import Path
-from typing import List, Optional
+from urllib.parse import quote
 from datetime import datetime
-import time
-from pdf_parser import pdf_parser
-from pdf_redactor import pdf_redactor, PIIMatch, RedactionType
-from models import PDFProcessingResult, UploadHistoryItem, ProcessingStatus, PIILocation, RedactionResult
-from clickhouse_service import clickhouse_service
-from file_storage import file_storage
+from concurrent.futures import ProcessPoolExecutor
+from pdf_processing import process_pdf_file
+from test_runner import run_test_suite
+from models import (
+    PDFProcessingResult, ProcessingStatus, RedactionResult,
+    HealthResponse, PDFUploadResponse, PDFProcessingResponse, UploadHistoryResponse,
+    StatisticsResponse, FindingsResponse, TestResultResponse
+)
+from clickhouse_service import get_clickhouse_service
+from file_storage import file_storage, UploadTooLargeError
+from utils import mask_pii_list
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def mask_pii_data(data: str) -> str:
-    """Mask PII data by showing only the first character and replacing the rest with asterisks"""
-    if not data or len(data) <= 1:
-        return data
-    return data[0] + '*' * (len(data) - 1)
-
-def mask_pii_list(data_list: List[str]) -> List[str]:
-    """Mask a list of PII data items"""
-    return [mask_pii_data(item) for item in data_list]
+class APIJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also accepts non-string dict keys"""
+    def render(self, content) -> bytes:
+        # Summaries such as redactions_by_page are keyed by page number
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
 
 # Create FastAPI app
 app = FastAPI(
     title="PDF Scanner Python Server",
     description="Python server for PDF processing and analysis",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson encodes responses several times faster than the stdlib json module
+    default_response_class=APIJSONResponse
 )
 
+# Largest PDF accepted by /api/upload-pdf
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+
+# Room for the multipart boundaries, part headers and filename around the
+# PDF itself in the request body
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Reject uploads that declare a body over the limit before it is read"""
+    # The File(...) parameter is parsed before the handler runs, so the check
+    # has to happen here; registered before CORS so the 413 keeps its headers.
+    # Content-Length covers the whole multipart body, so this is a coarse
+    # pre-check only; save_uploaded_stream enforces the exact file size
+    if request.method == "POST" and request.url.path == "/api/upload-pdf":
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            return APIJSONResponse(status_code=413, content={"detail": "PDF file is too large"})
+    return await call_next(request)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -46,60 +71,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Response models
-class HealthResponse(BaseModel):
-    status: str
-    message: str
-    server: str
-    version: str
-
-class PDFUploadResponse(BaseModel):
-    upload_id: str
-    status: str
-    message: str
-
-class PDFProcessingResponse(BaseModel):
-    upload_id: str
-    status: str
-    emails: List[str]
-    ssns: List[str]
-    text_length: int
-    pages_processed: int
-    processing_time: float
-    error: Optional[str] = None
-    # Redaction fields
-    redaction_applied: Optional[bool] = None
-    redacted_file_available: Optional[bool] = None
-    total_redactions: Optional[int] = None
-
-class UploadHistoryResponse(BaseModel):
-    uploads: List[UploadHistoryItem]
-    total_count: int
-
-class StatisticsResponse(BaseModel):
-    total_uploads: int
-    clean_pdfs: int
-    pii_pdfs: int
-    total_emails: int
-    total_ssns: int
-    avg_processing_time: float
-
-class FindingsResponse(BaseModel):
-    total_pdfs_processed: int
-    total_pii_items: int
-    success_rate: float
-    avg_processing_time: float
-    p95_processing_time: float
-    pii_types: dict
-    processing_trends: list
-    recent_uploads: list
-
-class TestResultResponse(BaseModel):
-    total_tests: int
-    passed: int
-    failed: int
-    success_rate: float
-    details: dict
+# Set to 0 when the schema is managed separately (python clickhouse_service.py)
+INIT_CLICKHOUSE_SCHEMA = os.getenv("INIT_CLICKHOUSE_SCHEMA", "1") == "1"
+
+# Auto-reload is for development only and runs a single server process
+UVICORN_RELOAD = os.getenv("UVICORN_RELOAD", "0") == "1"
+WEB_CONCURRENCY = 1 if UVICORN_RELOAD else int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+# Parsing, PII detection and redaction are CPU-bound, so they run in worker
+# processes instead of blocking the event loop; the cores are shared between
+# server workers
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)))
+
+# Set to the internal nginx location that serves the uploads directory (e.g.
+# /protected/) to have nginx send download bodies with sendfile instead of
+# streaming them through the Python process
+X_ACCEL_REDIRECT_PREFIX = os.getenv("X_ACCEL_REDIRECT_PREFIX")
+
+@app.on_event("startup")
+async def start_pdf_executor():
+    """Start the process pool used for PDF processing"""
+    # Workers come from a forkserver so they don't inherit the event loop,
+    # the ClickHouse connection pool or locks held by other threads
+    app.state.pdf_executor = ProcessPoolExecutor(
+        max_workers=PDF_PARSE_WORKERS,
+        mp_context=multiprocessing.get_context("forkserver"),
+    )
+    # Bounds how many PDFs are handed to the pool at once so queued uploads
+    # wait here instead of piling up inside the executor
+    app.state.pdf_slots = asyncio.Semaphore(PDF_PARSE_WORKERS)
+
+@app.on_event("shutdown")
+async def stop_pdf_executor():
+    """Stop the PDF processing process pool"""
+    app.state.pdf_executor.shutdown(wait=False, cancel_futures=True)
+
+@app.on_event("startup")
+async def init_clickhouse():
+    """Connect to ClickHouse and make sure the schema is in place"""
+    service = get_clickhouse_service()
+    if INIT_CLICKHOUSE_SCHEMA:
+        service.init_tables_once()
+
+@app.on_event("shutdown")
+async def flush_clickhouse():
+    """Write any queued upload results before the worker exits"""
+    get_clickhouse_service().flush()
 
 @app.get("/api/health", response_model=HealthResponse)
 async def health_check():
@@ -137,57 +154,56 @@ async def server_status():
         ]
     }
 
-async def process_pdf_background(upload_id: str, file_path: str, filename: str, file_size: int):
+def pdf_file_response(file_path: str, filename: str) -> Response:
+    """Return a stored PDF as a download, handing the body to nginx when configured"""
+    if not X_ACCEL_REDIRECT_PREFIX:
+        return FileResponse(path=file_path, filename=filename, media_type='application/pdf')
+    
+    relative_path = Path(file_path).resolve().relative_to(file_storage.upload_dir.resolve())
+    quoted_filename = quote(filename)
+    if quoted_filename != filename:
+        content_disposition = f"attachment; filename*=utf-8''{quoted_filename}"
+    else:
+        content_disposition = f'attachment; filename="{filename}"'
+    
+    return Response(
+        media_type='application/pdf',
+        headers={
+            "X-Accel-Redirect": X_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(relative_path.as_posix()),
+            "Content-Disposition": content_disposition
+        }
+    )
+
+async def process_pdf_background(upload_id: str, file_path: str, filename: str, file_size: int,
+                                 upload_date: datetime):
     """Background task to process PDF and store results with redaction"""
-    logger.info(f"Starting background processing for {filename}")
+    logger.info("Starting background processing for %s", filename)
     
     try:
-        # Parse the PDF for basic PII detection
-        start_time = time.time()
-        parse_result = pdf_parser.parse_pdf(Path(file_path))
-        processing_time = time.time() - start_time
-        
-        # Enhanced PII detection with coordinates for redaction
-        redaction_start_time = time.time()
-        pii_matches, detection_metadata = pdf_redactor.detect_pii_with_coordinates(Path(file_path))
-        redaction_time = time.time() - redaction_start_time
+        # Parse, detect and redact in a worker process
+        redacted_file_path = file_storage.get_redacted_file_path(upload_id, filename)
+        async with app.state.pdf_slots:
+            work = await asyncio.get_running_loop().run_in_executor(
+                app.state.pdf_executor, process_pdf_file, file_path, redacted_file_path
+            )
+        parse_result = work["parse_result"]
+        processing_time = work["processing_time"]
         
-        # Convert PII matches to PIILocation objects
-        pii_locations = []
-        for match in pii_matches:
-            pii_locations.append(PIILocation(
-                text=match.text,
-                type=match.type,
-                page_number=match.page_number,
-                x0=match.bbox.x0,
-                y0=match.bbox.y0,
-                x1=match.bbox.x1,
-                y1=match.bbox.y1,
-                confidence=match.confidence,
-                context=match.context
-            ))
+        # PIILocation objects were already built in the worker
+        pii_locations = work["pii_locations"]
         
-        # Create redacted PDF if PII is detected
         redaction_result = None
-        if pii_matches:
-            redacted_file_path = file_storage.get_redacted_file_path(upload_id, filename)
-            redaction_success = pdf_redactor.redact_pdf(
-                Path(file_path), 
-                Path(redacted_file_path), 
-                pii_matches
+        if work["redaction_summary"] is not None:
+            file_storage.remember_redacted_file(upload_id, redacted_file_path)
+            redaction_result = RedactionResult(
+                upload_id=upload_id,
+                original_file_path=file_path,
+                redacted_file_path=redacted_file_path,
+                redaction_summary=work["redaction_summary"],
+                pii_locations=pii_locations,
+                redaction_applied=True,
+                redaction_time=work["redaction_time"]
             )
-            
-            if redaction_success:
-                redaction_summary = pdf_redactor.get_redaction_summary(pii_matches)
-                redaction_result = RedactionResult(
-                    upload_id=upload_id,
-                    original_file_path=file_path,
-                    redacted_file_path=redacted_file_path,
-                    redaction_summary=redaction_summary,
-                    pii_locations=pii_locations,
-                    redaction_applied=True,
-                    redaction_time=redaction_time
-                )
         
         # Create processing result
         processing_result = PDFProcessingResult(
@@ -195,33 +211,34 @@ async def process_pdf_background(upload_id: str, file_path: str, filename: str,
             filename=filename,
             file_path=file_path,
             file_size=file_size,
-            upload_date=datetime.now(),
+            upload_date=upload_date,
             processing_date=datetime.now(),
-            status=ProcessingStatus.COMPLETE if parse_result["status"] == "SUCCESS" else ProcessingStatus.FAILED,
-            pages_processed=parse_result.get("pages_processed", 0),
-            text_length=parse_result.get("text_length", 0),
+            status=ProcessingStatus.COMPLETE if parse_result.status == "SUCCESS" else ProcessingStatus.FAILED,
+            pages_processed=parse_result.pages_processed,
+            text_length=parse_result.text_length,
             processing_time=processing_time,
-            emails=parse_result.get("emails", []),
-            ssns=parse_result.get("ssns", []),
-            error_message=parse_result.get("error"),
+            emails=parse_result.emails,
+            ssns=parse_result.ssns,
+            error_message=parse_result.error,
             redaction_result=redaction_result,
-            pii_locations=pii_locations
+            pii_locations=pii_locations,
+            total_redactions=len(pii_locations) if redaction_result else 0
         )
         
         # Store in ClickHouse
-        clickhouse_service.store_upload_result(processing_result)
+        get_clickhouse_service().store_upload_result(processing_result)
         
-        logger.info(f"Background processing complete for {filename} - {len(pii_matches)} PII items detected")
+        logger.info("Background processing complete for %s - %s PII items detected", filename, len(pii_locations))
         
     except Exception as e:
-        logger.error(f"Background processing failed for {filename}: {e}")
+        logger.error("Background processing failed for %s: %s", filename, e)
         # Store error result
         error_result = PDFProcessingResult(
             upload_id=upload_id,
             filename=filename,
             file_path=file_path,
             file_size=file_size,
-            upload_date=datetime.now(),
+            upload_date=upload_date,
             processing_date=datetime.now(),
             status=ProcessingStatus.FAILED,
             pages_processed=0,
@@ -231,24 +248,28 @@ async def process_pdf_background(upload_id: str, file_path: str, filename: str,
             ssns=[],
             error_message=str(e)
         )
-        clickhouse_service.store_upload_result(error_result)
+        get_clickhouse_service().store_upload_result(error_result)
 
 @app.post("/api/upload-pdf", response_model=PDFUploadResponse)
 async def upload_pdf(file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
     """Upload PDF file and start processing"""
-    logger.info(f"PDF upload requested: {file.filename}")
+    logger.info("PDF upload requested: %s", file.filename)
     
     # Validate file type
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
+    # The upload date is when the file reached the server, not when the
+    # background task got around to processing it
+    upload_date = datetime.now()
+    
     try:
-        # Read file content
-        content = await file.read()
-        file_size = len(content)
-        
-        # Save file to storage
-        upload_id, file_path = file_storage.save_uploaded_file(content, file.filename)
+        # Copy the spooled upload straight to its storage path so the whole
+        # PDF is never held in memory as a bytes object; the copy is blocking
+        # disk I/O, so it runs in the threadpool rather than on the event loop
+        upload_id, file_path, file_size = await run_in_threadpool(
+            file_storage.save_uploaded_stream, file.file, file.filename, MAX_UPLOAD_BYTES
+        )
         
         # Start background processing
         if background_tasks:
@@ -257,10 +278,11 @@ async def upload_pdf(file: UploadFile = File(...), background_tasks: BackgroundT
                 upload_id, 
                 file_path, 
                 file.filename, 
-                file_size
+                file_size,
+                upload_date
             )
         
-        logger.info(f"PDF upload successful: {upload_id}")
+        logger.info("PDF upload successful: %s", upload_id)
         
         return PDFUploadResponse(
             upload_id=upload_id,
@@ -268,14 +290,19 @@ async def upload_pdf(file: UploadFile = File(...), background_tasks: BackgroundT
             message="PDF uploaded successfully and processing started"
         )
         
+    except UploadTooLargeError as e:
+        # Chunked uploads carry no Content-Length, so the copy enforces it too
+        logger.warning("PDF upload rejected: %s", e)
+        raise HTTPException(status_code=413, detail="PDF file is too large")
     except Exception as e:
-        logger.error(f"PDF upload failed: {e}")
+        logger.error("PDF upload failed: %s", e)
         raise HTTPException(status_code=500, detail=f"PDF upload failed: {str(e)}")
 
 @app.get("/api/upload-status/{upload_id}", response_model=PDFProcessingResponse)
 async def get_upload_status(upload_id: str):
     """Get processing status for a specific upload"""
-    result = clickhouse_service.get_upload_by_id(upload_id)
+    # ClickHouse calls are blocking HTTP requests, keep them off the event loop
+    result = await run_in_threadpool(get_clickhouse_service().get_upload_by_id, upload_id)
     
     if not result:
         raise HTTPException(status_code=404, detail="Upload not found")
@@ -291,43 +318,66 @@ async def get_upload_status(upload_id: str):
         error=result.error_message,
         redaction_applied=result.redaction_result is not None if result.redaction_result else None,
         redacted_file_available=result.redaction_result.redacted_file_path is not None if result.redaction_result else None,
-        total_redactions=result.redaction_result.redaction_summary.get('total_redactions', 0) if result.redaction_result else None
+        total_redactions=result.total_redactions if result.redaction_result else None
     )
 
 @app.get("/api/upload-history", response_model=UploadHistoryResponse)
 async def get_upload_history(limit: int = 50):
     """Get upload history from ClickHouse"""
-    uploads = clickhouse_service.get_upload_history(limit)
+    uploads = await run_in_threadpool(get_clickhouse_service().get_upload_history, limit)
     
-    return UploadHistoryResponse(
-        uploads=uploads,
-        total_count=len(uploads)
-    )
+    # Items are built by the service itself; orjson encodes their datetimes
+    # natively, so skip pydantic's per-field JSON pass
+    return APIJSONResponse({
+        "uploads": [item.model_dump() for item in uploads],
+        "total_count": len(uploads)
+    })
+
+@app.get("/api/upload-history/stream")
+async def stream_upload_history(limit: int = 50):
+    """Stream upload history from ClickHouse as newline-delimited JSON"""
+    def blocks():
+        # Each block is encoded and sent as soon as it arrives, so memory
+        # stays flat however large limit is; Starlette iterates this sync
+        # generator in the threadpool, keeping the blocking reads off the
+        # event loop
+        try:
+            for items in get_clickhouse_service().iter_upload_history_blocks(limit):
+                yield b"".join(orjson.dumps(item.model_dump()) + b"\n" for item in items)
+        except Exception as e:
+            # Re-raise so the connection is aborted and the client sees a
+            # truncated response rather than a short but valid one
+            logger.error("Failed to stream upload history: %s", e)
+            raise
+    
+    return StreamingResponse(blocks(), media_type="application/x-ndjson")
 
 
 
 @app.get("/api/statistics", response_model=StatisticsResponse)
 async def get_statistics():
     """Get processing statistics from ClickHouse"""
-    stats = clickhouse_service.get_statistics()
+    stats = await run_in_threadpool(get_clickhouse_service().get_statistics)
     
-    return StatisticsResponse(**stats)
+    # The service builds this dict itself, so skip re-validating it
+    return APIJSONResponse(stats)
 
 @app.get("/api/findings", response_model=FindingsResponse)
 async def get_findings():
     """Get findings and analytics data for metrics page"""
     logger.info("Findings requested")
-    findings = clickhouse_service.get_findings()
-    return FindingsResponse(**findings)
+    findings = await run_in_threadpool(get_clickhouse_service().get_findings)
+    # The service builds this dict itself, so skip re-validating it
+    return APIJSONResponse(findings)
 
 @app.get("/api/download-pdf/{upload_id}")
 async def download_pdf(upload_id: str):
     """Download a processed PDF file"""
-    logger.info(f"PDF download requested for upload_id: {upload_id}")
+    logger.info("PDF download requested for upload_id: %s", upload_id)
     
     try:
         # Get upload details from ClickHouse
-        upload_result = clickhouse_service.get_upload_by_id(upload_id)
+        upload_result = await run_in_threadpool(get_clickhouse_service().get_upload_by_id, upload_id)
         if not upload_result:
             raise HTTPException(status_code=404, detail="Upload not found")
         
@@ -337,55 +387,50 @@ async def download_pdf(upload_id: str):
             raise HTTPException(status_code=404, detail="PDF file not found")
         
         # Return the file
-        return FileResponse(
-            path=str(file_path),
-            filename=upload_result.filename,
-            media_type='application/pdf'
-        )
+        return pdf_file_response(str(file_path), upload_result.filename)
         
     except Exception as e:
-        logger.error(f"Download failed for upload_id {upload_id}: {e}")
+        logger.error("Download failed for upload_id %s: %s", upload_id, e)
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
 @app.get("/api/download-redacted-pdf/{upload_id}")
 async def download_redacted_pdf(upload_id: str):
     """Download redacted PDF file"""
-    logger.info(f"Redacted PDF download requested for upload_id: {upload_id}")
+    logger.info("Redacted PDF download requested for upload_id: %s", upload_id)
     
     try:
-        # Get upload details from ClickHouse
-        upload_result = clickhouse_service.get_upload_by_id(upload_id)
-        if not upload_result:
-            raise HTTPException(status_code=404, detail="Upload not found")
-        
-        # Check if redacted file exists
-        redacted_file_path = file_storage.get_redacted_file_path(upload_id, upload_result.filename)
-        if not Path(redacted_file_path).exists():
-            raise HTTPException(status_code=404, detail="Redacted PDF file not found")
+        # Redacted files written by this server are served without a lookup
+        redacted_file_path = file_storage.get_cached_redacted_file(upload_id)
+        if redacted_file_path is None:
+            # Get upload details from ClickHouse
+            upload_result = await run_in_threadpool(get_clickhouse_service().get_upload_by_id, upload_id)
+            if not upload_result:
+                raise HTTPException(status_code=404, detail="Upload not found")
+            
+            # Check if redacted file exists
+            redacted_file_path = file_storage.get_redacted_file_path(upload_id, upload_result.filename)
+            if not Path(redacted_file_path).exists():
+                raise HTTPException(status_code=404, detail="Redacted PDF file not found")
+            file_storage.remember_redacted_file(upload_id, redacted_file_path)
         
-        # Create redacted filename
-        name, ext = os.path.splitext(upload_result.filename)
-        redacted_filename = f"{name}_redacted{ext}"
+        # The stored name is already "<name>_redacted<ext>"
+        redacted_filename = os.path.basename(redacted_file_path)
         
         # Return the redacted file
-        return FileResponse(
-            path=redacted_file_path,
-            filename=redacted_filename,
-            media_type='application/pdf'
-        )
+        return pdf_file_response(redacted_file_path, redacted_filename)
         
     except Exception as e:
-        logger.error(f"Redacted download failed for upload_id {upload_id}: {e}")
+        logger.error("Redacted download failed for upload_id %s: %s", upload_id, e)
         raise HTTPException(status_code=500, detail=f"Redacted download failed: {str(e)}")
 
 @app.get("/api/redaction-details/{upload_id}")
 async def get_redaction_details(upload_id: str):
     """Get detailed redaction information for an upload"""
-    logger.info(f"Redaction details requested for upload_id: {upload_id}")
+    logger.info("Redaction details requested for upload_id: %s", upload_id)
     
     try:
         # Get upload details from ClickHouse
-        upload_result = clickhouse_service.get_upload_by_id(upload_id)
+        upload_result = await run_in_threadpool(get_clickhouse_service().get_upload_by_id, upload_id)
         if not upload_result:
             raise HTTPException(status_code=404, detail="Upload not found")
         
@@ -401,13 +446,13 @@ async def get_redaction_details(upload_id: str):
             "upload_id": upload_id,
             "redaction_applied": True,
             "redaction_summary": upload_result.redaction_result.redaction_summary,
-            "pii_locations": [loc.dict() for loc in upload_result.pii_locations],
+            "pii_locations": [loc.model_dump(mode='json') for loc in upload_result.pii_locations],
             "redaction_time": upload_result.redaction_result.redaction_time,
             "total_redactions": len(upload_result.pii_locations)
         }
         
     except Exception as e:
-        logger.error(f"Failed to get redaction details for upload_id {upload_id}: {e}")
+        logger.error("Failed to get redaction details for upload_id %s: %s", upload_id, e)
         raise HTTPException(status_code=500, detail=f"Failed to get redaction details: {str(e)}")
 
 @app.post("/api/run-tests", response_model=TestResultResponse)
@@ -416,16 +461,15 @@ async def run_tests():
     logger.info("Test suite execution requested")
     
     try:
-        from test_runner import TestRunner
-        
-        runner = TestRunner()
-        results = runner.run_all_tests()
-        comparison = runner.compare_results()
+        # Parsing the test corpus is CPU-bound, run it in the PDF process pool
+        comparison = await asyncio.get_running_loop().run_in_executor(
+            app.state.pdf_executor, run_test_suite
+        )
         
         # Calculate success rate
         success_rate = (comparison["passed"] / comparison["total_tests"] * 100) if comparison["total_tests"] > 0 else 0
         
-        logger.info(f"Test suite complete: {comparison['passed']}/{comparison['total_tests']} passed")
+        logger.info("Test suite complete: %s/%s passed", comparison['passed'], comparison['total_tests'])
         
         return TestResultResponse(
             total_tests=comparison["total_tests"],
@@ -436,15 +480,18 @@ async def run_tests():
         )
         
     except Exception as e:
-        logger.error(f"Test suite execution failed: {e}")
+        logger.error("Test suite execution failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Test execution failed: {str(e)}")
 
 if __name__ == "__main__":
     logger.info("Starting Python server on port 8080...")
+    # uvloop and httptools come with uvicorn[standard] and are picked up
+    # automatically when installed
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8080,
-        reload=True,
+        reload=UVICORN_RELOAD,
+        workers=WEB_CONCURRENCY,
         log_level="info"
     ) 
\ No newline at end of file
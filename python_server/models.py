@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional, Dict
 from datetime import datetime
 from enum import Enum
@@ -61,6 +61,7 @@ class PDFProcessingResult(BaseModel):
     # New fields for redaction
     redaction_result: Optional[RedactionResult] = None
     pii_locations: List[PIILocation] = []
+    total_redactions: int = 0
 
 class UploadHistoryItem(BaseModel):
     upload_id: str
@@ -78,4 +79,73 @@ class UploadHistoryItem(BaseModel):
     # New fields for redaction
     redaction_applied: bool = False
     redacted_file_available: bool = False
-    total_redactions: int = 0 
\ No newline at end of file
+    total_redactions: int = 0 
+
+# Response models
+class HealthResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore', frozen=True)
+    
+    status: str
+    message: str
+    server: str
+    version: str
+
+class PDFUploadResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore', frozen=True)
+    
+    upload_id: str
+    status: str
+    message: str
+
+class PDFProcessingResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore', frozen=True)
+    
+    upload_id: str
+    status: str
+    emails: List[str]
+    ssns: List[str]
+    text_length: int
+    pages_processed: int
+    processing_time: float
+    error: Optional[str] = None
+    # Redaction fields
+    redaction_applied: Optional[bool] = None
+    redacted_file_available: Optional[bool] = None
+    total_redactions: Optional[int] = None
+
+class UploadHistoryResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore', frozen=True)
+    
+    uploads: List[UploadHistoryItem]
+    total_count: int
+
+class StatisticsResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore', frozen=True)
+    
+    total_uploads: int
+    clean_pdfs: int
+    pii_pdfs: int
+    total_emails: int
+    total_ssns: int
+    avg_processing_time: float
+
+class FindingsResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore', frozen=True)
+    
+    total_pdfs_processed: int
+    total_pii_items: int
+    success_rate: float
+    avg_processing_time: float
+    p95_processing_time: float
+    pii_types: dict
+    processing_trends: list
+    recent_uploads: list
+
+class TestResultResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore', frozen=True)
+    
+    total_tests: int
+    passed: int
+    failed: int
+    success_rate: float
+    details: dict
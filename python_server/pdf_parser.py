@@ -1,182 +1,182 @@
-import re
 import logging
+from itertools import chain
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import List, Optional, Tuple, Union
+from dataclasses import dataclass
 import fitz  # PyMuPDF
+from utils import is_valid_ssn, re_engine as re
 
 logger = logging.getLogger(__name__)
 
+# Patterns are compiled as bytes and run over UTF-8 encoded page text: all of
+# them are ASCII, bytes matching skips Unicode character classes, and RE2
+# would otherwise encode the text again on every call
+
+# Email regex pattern - supports various email formats
+EMAIL_PATTERN = re.compile(
+    rb'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+)
+
+# SSN regex pattern - one alternation over the supported formats so the text
+# is scanned once
+SSN_PATTERN = re.compile(
+    # Standard format: XXX-XX-XXXX
+    rb'\b\d{3}-\d{2}-\d{4}\b'
+    # No dashes: XXXXXXXXX
+    rb'|\b\d{9}\b'
+    # Space separated: XXX XX XXXX
+    rb'|\b\d{3}\s\d{2}\s\d{4}\b'
+)
+
+# False positive patterns to exclude, as one alternation so a candidate is
+# searched once
+FALSE_POSITIVE_PATTERN = re.compile(
+    # Part numbers like 123-45-678 (not 9 digits)
+    rb'\b\d{3}-\d{2}-\d{3}\b'
+    # Phone numbers
+    rb'|\b\d{3}-\d{3}-\d{4}\b'
+    # Dates
+    rb'|\b\d{1,2}-\d{1,2}-\d{4}\b'
+)
+
+# Words near an SSN that mark it as some other kind of number, as one
+# case-insensitive alternation so the context is scanned once rather than
+# per word and never lower-cased
+FALSE_POSITIVE_INDICATOR_PATTERN = re.compile(b'(?i)' + b'|'.join(map(re.escape, [
+    b'part number', b'part #', b'serial number', b'serial #',
+    b'model number', b'model #', b'reference number', b'ref #',
+    b'phone', b'tel', b'fax', b'date', b'birth', b'dob'
+])))
+
+@dataclass(slots=True, frozen=True)
+class ParseResult:
+    """Result of parsing a PDF for PII"""
+    status: str
+    pages_processed: int
+    text_length: int
+    emails: List[str]
+    ssns: List[str]
+    error: Optional[str] = None
+
 class PDFParser:
     """PDF parser with PII detection capabilities using PyMuPDF"""
     
-    def __init__(self):
-        # Email regex pattern - supports various email formats
-        self.email_pattern = re.compile(
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        )
-        
-        # SSN regex patterns - supports various formats
-        self.ssn_patterns = [
-            # Standard format: XXX-XX-XXXX
-            re.compile(r'\b\d{3}-\d{2}-\d{4}\b'),
-            # No dashes: XXXXXXXXX
-            re.compile(r'\b\d{9}\b'),
-            # Space separated: XXX XX XXXX
-            re.compile(r'\b\d{3}\s\d{2}\s\d{4}\b'),
-        ]
-        
-        # False positive patterns to exclude
-        self.false_positive_patterns = [
-            # Part numbers like 123-45-678 (not 9 digits)
-            re.compile(r'\b\d{3}-\d{2}-\d{3}\b'),
-            # Phone numbers
-            re.compile(r'\b\d{3}-\d{3}-\d{4}\b'),
-            # Dates
-            re.compile(r'\b\d{1,2}-\d{1,2}-\d{4}\b'),
-        ]
-    
-    def extract_text_from_pdf(self, pdf_path: Path) -> Tuple[bool, str, Optional[str]]:
+    def extract_text_from_pdf(self, pdf: Union[Path, fitz.Document]) -> Tuple[bool, List[str], Optional[str], int]:
         """
         Extract text from PDF file using PyMuPDF
         
+        Accepts either a path or an already open document, so callers that
+        need the document for anything else only parse the file once
+        
         Returns:
-            Tuple of (success, text, error_message)
+            Tuple of (success, text of each page that has any, error_message, page_count)
         """
         try:
-            # Open PDF with PyMuPDF
-            doc = fitz.open(str(pdf_path))
-            
-            # Check if PDF is encrypted
-            if doc.needs_pass:
-                doc.close()
-                raise Exception("PDF is encrypted and cannot be processed")
-            
-            # Extract text from all pages
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                page_text = page.get_text()
-                if page_text:
-                    text += page_text + "\n"
-            
-            doc.close()
+            # Open PDF with PyMuPDF unless the caller already did
+            doc = pdf if isinstance(pdf, fitz.Document) else fitz.open(str(pdf))
+            try:
+                # Check if PDF is encrypted
+                if doc.needs_pass:
+                    raise Exception("PDF is encrypted and cannot be processed")
+                
+                # Extract text page by page; pages are scanned one at a time
+                # rather than joined into a single document-sized string
+                pages_text = [page_text for page in doc if (page_text := page.get_text())]
+                page_count = len(doc)
+            finally:
+                if doc is not pdf:
+                    doc.close()
             
-            if text.strip():
-                return True, text, None
+            if any(not page_text.isspace() for page_text in pages_text):
+                return True, pages_text, None, page_count
             else:
-                return False, "", "No text could be extracted from PDF"
+                return False, [], "No text could be extracted from PDF", 0
                 
         except Exception as e:
             error_msg = f"Error extracting text from PDF: {str(e)}"
             logger.error(error_msg)
-            return False, "", error_msg
+            return False, [], error_msg, 0
     
-    def detect_emails(self, text: str) -> List[str]:
-        """Detect email addresses in text"""
-        emails = self.email_pattern.findall(text)
-        # Remove duplicates while preserving order
-        unique_emails = []
-        seen = set()
-        for email in emails:
-            if email.lower() not in seen:
-                unique_emails.append(email)
-                seen.add(email.lower())
-        return unique_emails
+    def detect_emails(self, pages_text: List[bytes]) -> List[str]:
+        """Detect email addresses in the UTF-8 encoded text of each page"""
+        emails = [email.decode() for email in chain.from_iterable(map(EMAIL_PATTERN.findall, pages_text))]
+        # Remove duplicates while preserving order, ignoring case; building the
+        # dict from the reversed list leaves each address in its first casing
+        first_casing = dict(zip(map(str.lower, reversed(emails)), reversed(emails)))
+        return [first_casing[email] for email in dict.fromkeys(map(str.lower, emails))]
     
-    def detect_ssns(self, text: str) -> List[str]:
-        """Detect SSNs in text, avoiding false positives"""
-        ssns = []
-        
-        # Find all potential SSN matches
-        for pattern in self.ssn_patterns:
-            matches = pattern.findall(text)
-            ssns.extend(matches)
-        
-        # Remove duplicates
-        unique_ssns = list(set(ssns))
-        
-        # Filter out false positives
-        filtered_ssns = []
-        for ssn in unique_ssns:
-            if not self._is_false_positive(ssn, text):
-                filtered_ssns.append(ssn)
-        
-        return filtered_ssns
+    def detect_ssns(self, pages_text: List[bytes]) -> List[str]:
+        """Detect SSNs in the UTF-8 encoded text of each page, avoiding false positives"""
+        # Find all potential SSN matches, keeping the order they appear in and
+        # the page and position where each one first appears
+        first_seen = {}
+        for page_text in pages_text:
+            for match in SSN_PATTERN.finditer(page_text):
+                first_seen.setdefault(match.group(), (page_text, match.start()))
+        
+        # Filter out false positives, decoding only the SSNs that are kept
+        return [ssn.decode() for ssn, (page_text, ssn_index) in first_seen.items()
+                if not self._is_false_positive(ssn, page_text, ssn_index)]
     
-    def _is_false_positive(self, ssn: str, context_text: str) -> bool:
-        """Check if SSN is a false positive"""
+    def _is_false_positive(self, ssn: bytes, context_text: bytes, ssn_index: int) -> bool:
+        """Check if SSN found at ssn_index in context_text is a false positive"""
+        # Numbers the SSA never issues
+        if not is_valid_ssn(ssn.decode()):
+            return True
+        
         # Check against false positive patterns
-        for pattern in self.false_positive_patterns:
-            if pattern.search(ssn):
-                return True
+        if FALSE_POSITIVE_PATTERN.search(ssn):
+            return True
         
         # Additional context-based checks
-        # Look for context around the SSN
-        ssn_index = context_text.find(ssn)
-        if ssn_index != -1:
-            # Get surrounding context (50 characters on each side)
-            start = max(0, ssn_index - 50)
-            end = min(len(context_text), ssn_index + len(ssn) + 50)
-            context = context_text[start:end].lower()
-            
-            # Check for false positive indicators
-            false_positive_indicators = [
-                'part number', 'part #', 'serial number', 'serial #',
-                'model number', 'model #', 'reference number', 'ref #',
-                'phone', 'tel', 'fax', 'date', 'birth', 'dob'
-            ]
-            
-            for indicator in false_positive_indicators:
-                if indicator in context:
-                    return True
+        # Look for context around the SSN (50 bytes on each side),
+        # searched in place rather than sliced out
+        start = max(0, ssn_index - 50)
+        end = min(len(context_text), ssn_index + len(ssn) + 50)
+        
+        # Check for false positive indicators
+        if FALSE_POSITIVE_INDICATOR_PATTERN.search(context_text, start, end):
+            return True
         
         return False
     
-    def parse_pdf(self, pdf_path: Path) -> Dict:
+    def parse_pdf(self, pdf_path: Path) -> ParseResult:
         """
         Parse PDF and detect PII
         
         Returns:
-            Dictionary with parsing results
+            ParseResult with parsing results
         """
-        logger.info(f"Parsing PDF: {pdf_path}")
+        logger.info("Parsing PDF: %s", pdf_path)
         
-        # Extract text and get page count
-        success, text, error = self.extract_text_from_pdf(pdf_path)
+        # Extract text and get page count from a single open of the file
+        success, pages_text, error, pages_processed = self.extract_text_from_pdf(pdf_path)
         
         if not success:
-            return {
-                "status": "FAILED",
-                "error": error,
-                "emails": [],
-                "ssns": [],
-                "text_length": 0,
-                "pages_processed": 0
-            }
-        
-        # Get actual page count from PyMuPDF
-        try:
-            doc = fitz.open(str(pdf_path))
-            pages_processed = len(doc)
-            doc.close()
-        except:
-            # Fallback to text-based estimation
-            pages_processed = text.count('\f') + 1
-        
-        # Detect PII
-        emails = self.detect_emails(text)
-        ssns = self.detect_ssns(text)
-        
-        result = {
-            "status": "SUCCESS",
-            "emails": emails,
-            "ssns": ssns,
-            "text_length": len(text),
-            "pages_processed": pages_processed,
-            "error": None
-        }
+            return ParseResult(
+                status="FAILED",
+                pages_processed=0,
+                text_length=0,
+                emails=[],
+                ssns=[],
+                error=error
+            )
+        
+        # Detect PII, encoding each page once for the bytes patterns
+        pages_bytes = [page_text.encode() for page_text in pages_text]
+        emails = self.detect_emails(pages_bytes)
+        ssns = self.detect_ssns(pages_bytes)
+        
+        result = ParseResult(
+            status="SUCCESS",
+            pages_processed=pages_processed,
+            # Length of the text as if the pages were joined by newlines
+            text_length=sum(map(len, pages_text)) + len(pages_text),
+            emails=emails,
+            ssns=ssns
+        )
         
-        logger.info(f"Parsing complete: {len(emails)} emails, {len(ssns)} SSNs found")
+        logger.info("Parsing complete: %s emails, %s SSNs found", len(emails), len(ssns))
         return result
 
 # Global parser instance
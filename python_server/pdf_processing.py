@@ -0,0 +1,55 @@
+import time
+from pathlib import Path
+from typing import Dict
+from pdf_parser import pdf_parser
+from pdf_redactor import pdf_redactor
+from models import PIILocation, RedactionType
+
+def process_pdf_file(file_path: str, redacted_file_path: str) -> Dict:
+    """
+    Parse, detect PII in and redact a PDF in one call, so the whole CPU-bound
+    pipeline can run in a worker process
+    
+    Returns:
+        Dictionary of picklable values that can be sent back to the server process
+    """
+    # Parse the PDF for basic PII detection
+    start_time = time.time()
+    parse_result = pdf_parser.parse_pdf(Path(file_path))
+    processing_time = time.time() - start_time
+    
+    # Enhanced PII detection with coordinates for redaction
+    redaction_start_time = time.time()
+    pii_matches, detection_metadata = pdf_redactor.detect_pii_with_coordinates(Path(file_path))
+    redaction_time = time.time() - redaction_start_time
+    
+    # Plain coordinates instead of fitz.Rect so the result pickles cleanly;
+    # the values come from our own detector, so skip pydantic validation
+    pii_locations = [
+        PIILocation.model_construct(
+            text=match.text,
+            type=RedactionType(match.type.value),
+            page_number=match.page_number,
+            x0=match.bbox.x0,
+            y0=match.bbox.y0,
+            x1=match.bbox.x1,
+            y1=match.bbox.y1,
+            confidence=match.confidence,
+            context=match.context
+        )
+        for match in pii_matches
+    ]
+    
+    # Create redacted PDF if PII is detected
+    redaction_summary = None
+    if pii_matches:
+        if pdf_redactor.redact_pdf(Path(file_path), Path(redacted_file_path), pii_matches):
+            redaction_summary = pdf_redactor.get_redaction_summary(pii_matches)
+    
+    return {
+        "parse_result": parse_result,
+        "processing_time": processing_time,
+        "pii_locations": pii_locations,
+        "redaction_time": redaction_time,
+        "redaction_summary": redaction_summary
+    }
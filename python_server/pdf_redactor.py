@@ -1,13 +1,33 @@
-import re
+import bisect
 import logging
+import os
 import fitz  # PyMuPDF
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Set
+from typing import Dict, Iterator, List, Optional, Tuple, Set
 from dataclasses import dataclass
 from enum import Enum
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from utils import is_valid_ssn, passes_luhn, re_engine as re
 
 logger = logging.getLogger(__name__)
 
+# Text extraction flags for span detection: the defaults minus image blocks
+SPAN_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Worker processes used to detect PII in one long document. The server
+# already runs whole documents in a process pool, so this stays at 1 there
+# and is meant for standalone batch runs on many-core machines
+DETECTION_WORKERS = int(os.getenv("PDF_DETECTION_WORKERS", "1"))
+
+# Each detection worker gets at least this many pages, so short documents
+# are never worth the cost of starting processes
+PAGES_PER_DETECTION_WORKER = 16
+
+# Joins the spans of a page into one string for scanning; no PII pattern
+# matches it, so a match always lies within a single span
+SPAN_SEPARATOR = "\x00"
+
 class RedactionType(str, Enum):
     EMAIL = "email"
     SSN = "ssn"
@@ -33,37 +53,70 @@ class RedactionRectangle:
     original_text: str
     replacement_text: str = "[REDACTED]"
 
+# Enhanced regex patterns with better context, compiled once at import
+PII_PATTERNS = {
+    RedactionType.EMAIL: re.compile(
+        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+    ),
+    RedactionType.SSN: [
+        re.compile(r'\b\d{3}-\d{2}-\d{4}\b'),  # XXX-XX-XXXX
+        re.compile(r'\b\d{9}\b'),              # XXXXXXXXX
+        re.compile(r'\b\d{3}\s\d{2}\s\d{4}\b'), # XXX XX XXXX
+    ],
+    RedactionType.PHONE: [
+        re.compile(r'\b\d{3}-\d{3}-\d{4}\b'),  # XXX-XXX-XXXX
+        re.compile(r'\b\(\d{3}\)\s\d{3}-\d{4}\b'),  # (XXX) XXX-XXXX
+        re.compile(r'\b\d{10}\b'),  # XXXXXXXXXX
+    ],
+    RedactionType.CREDIT_CARD: [
+        re.compile(r'\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b'),  # XXXX-XXXX-XXXX-XXXX
+        re.compile(r'\b\d{4}\s\d{4}\s\d{4}\s\d{4}\b'),  # XXXX XXXX XXXX XXXX
+    ]
+}
+
+# All patterns fused into one alternation with a named group per PII type,
+# so each span is scanned once instead of once per pattern; match.lastgroup
+# names the type that matched
+COMBINED_PII_PATTERN = re.compile('|'.join(
+    f'(?P<{pii_type.value}>' + '|'.join(
+        pattern.pattern for pattern in (patterns if isinstance(patterns, list) else [patterns])
+    ) + ')'
+    for pii_type, patterns in PII_PATTERNS.items()
+))
+
+PII_CONFIDENCES = {
+    RedactionType.EMAIL: 1.0,
+    RedactionType.SSN: 0.95,
+    RedactionType.PHONE: 0.9,
+    RedactionType.CREDIT_CARD: 0.85,
+}
+
+# Text drawn over each redacted area, by PII type
+REPLACEMENT_TEXTS = {
+    RedactionType.EMAIL: "[EMAIL REDACTED]",
+    RedactionType.SSN: "[SSN REDACTED]",
+    RedactionType.PHONE: "[PHONE REDACTED]",
+    RedactionType.CREDIT_CARD: "[CREDIT CARD REDACTED]",
+}
+
+# False positive patterns, as one alternation so a candidate is searched once
+FALSE_POSITIVE_PATTERN = re.compile(
+    r'\b\d{3}-\d{2}-\d{3}\b'  # Part numbers
+    r'|\b\d{1,2}-\d{1,2}-\d{4}\b'  # Dates
+)
+
+# Words in the surrounding text that mark a number as something other than
+# an SSN, as one case-insensitive alternation so the context is scanned once
+# and never lower-cased
+FALSE_POSITIVE_INDICATOR_PATTERN = re.compile('(?i)' + '|'.join(map(re.escape, [
+    'part number', 'part #', 'serial number', 'serial #',
+    'model number', 'model #', 'reference number', 'ref #',
+    'date', 'birth', 'dob'
+])))
+
 class PDFRedactor:
     """Advanced PDF redactor with coordinate-based PII detection and redaction"""
     
-    def __init__(self):
-        # Enhanced regex patterns with better context
-        self.patterns = {
-            RedactionType.EMAIL: re.compile(
-                r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-            ),
-            RedactionType.SSN: [
-                re.compile(r'\b\d{3}-\d{2}-\d{4}\b'),  # XXX-XX-XXXX
-                re.compile(r'\b\d{9}\b'),              # XXXXXXXXX
-                re.compile(r'\b\d{3}\s\d{2}\s\d{4}\b'), # XXX XX XXXX
-            ],
-            RedactionType.PHONE: [
-                re.compile(r'\b\d{3}-\d{3}-\d{4}\b'),  # XXX-XXX-XXXX
-                re.compile(r'\b\(\d{3}\)\s\d{3}-\d{4}\b'),  # (XXX) XXX-XXXX
-                re.compile(r'\b\d{10}\b'),  # XXXXXXXXXX
-            ],
-            RedactionType.CREDIT_CARD: [
-                re.compile(r'\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b'),  # XXXX-XXXX-XXXX-XXXX
-                re.compile(r'\b\d{4}\s\d{4}\s\d{4}\s\d{4}\b'),  # XXXX XXXX XXXX XXXX
-            ]
-        }
-        
-        # False positive patterns
-        self.false_positive_patterns = [
-            re.compile(r'\b\d{3}-\d{2}-\d{3}\b'),  # Part numbers
-            re.compile(r'\b\d{1,2}-\d{1,2}-\d{4}\b'),  # Dates
-        ]
-    
     def detect_pii_with_coordinates(self, pdf_path: Path) -> Tuple[List[PIIMatch], Dict]:
         """
         Detect PII in PDF with exact coordinates for redaction
@@ -71,7 +124,7 @@ class PDFRedactor:
         Returns:
             Tuple of (pii_matches, metadata)
         """
-        logger.info(f"Detecting PII with coordinates in: {pdf_path}")
+        logger.info("Detecting PII with coordinates in: %s", pdf_path)
         
         try:
             doc = fitz.open(str(pdf_path))
@@ -80,30 +133,15 @@ class PDFRedactor:
                 doc.close()
                 raise Exception("PDF is encrypted and cannot be processed")
             
-            pii_matches = []
             total_pages = len(doc)
+            workers = min(DETECTION_WORKERS, total_pages // PAGES_PER_DETECTION_WORKER)
             
-            for page_num in range(total_pages):
-                page = doc.load_page(page_num)
-                
-                # Get text blocks with coordinates
-                text_blocks = page.get_text("dict")
-                
-                # Process each text block
-                for block in text_blocks.get("blocks", []):
-                    if "lines" in block:  # Text block
-                        for line in block["lines"]:
-                            for span in line["spans"]:
-                                text = span["text"]
-                                bbox = fitz.Rect(span["bbox"])
-                                
-                                # Detect PII in this text span
-                                matches = self._detect_pii_in_span(
-                                    text, bbox, page_num, span
-                                )
-                                pii_matches.extend(matches)
-            
-            doc.close()
+            if workers > 1:
+                doc.close()
+                pii_matches = self._detect_pii_in_parallel(pdf_path, total_pages, workers)
+            else:
+                pii_matches = self._detect_pii_in_pages(doc, range(total_pages))
+                doc.close()
             
             # Remove duplicates and overlapping matches
             pii_matches = self._deduplicate_matches(pii_matches)
@@ -114,88 +152,131 @@ class PDFRedactor:
                 "matches_by_type": self._count_matches_by_type(pii_matches)
             }
             
-            logger.info(f"Detection complete: {len(pii_matches)} PII items found")
+            logger.info("Detection complete: %s PII items found", len(pii_matches))
             return pii_matches, metadata
             
         except Exception as e:
-            logger.error(f"Error detecting PII: {str(e)}")
+            logger.error("Error detecting PII: %s", e)
             raise
     
-    def _detect_pii_in_span(self, text: str, bbox: fitz.Rect, page_num: int, span: Dict) -> List[PIIMatch]:
-        """Detect PII in a specific text span with coordinates"""
+    def _detect_pii_in_pages(self, doc: fitz.Document, page_numbers: range) -> List[PIIMatch]:
+        """Detect PII with coordinates on the given pages of an open document"""
+        pii_matches = []
+        for page_num in page_numbers:
+            page = doc.load_page(page_num)
+            # Build the page's text layout once; span extraction and every
+            # search_for() call below reuse it instead of re-parsing the page
+            textpage = page.get_textpage(flags=SPAN_TEXT_FLAGS)
+            
+            # Detect PII in all text spans of this page at once
+            spans = list(self._iter_page_spans(page, textpage))
+            pii_matches.extend(self._detect_pii_in_page(page, spans, page_num, textpage))
+        return pii_matches
+    
+    def _detect_pii_in_parallel(self, pdf_path: Path, total_pages: int, workers: int) -> List[PIIMatch]:
+        """Detect PII by splitting the pages into contiguous ranges across worker processes"""
+        pages_per_worker = -(-total_pages // workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_detect_pii_in_page_range, str(pdf_path), start,
+                                min(start + pages_per_worker, total_pages))
+                for start in range(0, total_pages, pages_per_worker)
+            ]
+            # Collected in page order, as the serial path produces them
+            pii_matches = []
+            for future in futures:
+                for match in future.result():
+                    match.bbox = fitz.Rect(match.bbox)
+                    pii_matches.append(match)
+        return pii_matches
+    
+    def _iter_page_spans(self, page: fitz.Page, textpage: Optional[fitz.TextPage] = None) -> Iterator[Dict]:
+        """Yield the text spans of a page with their coordinates"""
+        # Image blocks are never scanned, so skip extracting their pixels
+        text_blocks = page.get_text("dict", flags=SPAN_TEXT_FLAGS, textpage=textpage)
+        for block in text_blocks.get("blocks", []):
+            for line in block.get("lines", []):
+                yield from line["spans"]
+    
+    def _detect_pii_in_page(self, page: fitz.Page, spans: List[Dict], page_num: int,
+                            textpage: Optional[fitz.TextPage] = None) -> List[PIIMatch]:
+        """Detect PII in the text spans of a page with coordinates"""
         matches = []
+        texts = [span["text"] for span in spans]
+        
+        # Scan the whole page in one call. Spans are joined with a character
+        # none of the patterns can match, so no match crosses a span, and
+        # span_starts maps each match back to the span it was found in
+        page_text = SPAN_SEPARATOR.join(texts)
+        span_starts = []
+        offset = 0
+        for text in texts:
+            span_starts.append(offset)
+            offset += len(text) + 1
+        
+        hits = []
+        for match in COMBINED_PII_PATTERN.finditer(page_text):
+            span_index = bisect.bisect_right(span_starts, match.start()) - 1
+            pii_type = RedactionType(match.lastgroup)
+            if pii_type == RedactionType.SSN and self._is_false_positive(match.group(), texts[span_index]):
+                continue
+            # Card-shaped numbers that fail the checksum are not card numbers
+            if pii_type == RedactionType.CREDIT_CARD and not passes_luhn(match.group()):
+                continue
+            hits.append((match, pii_type, span_index))
+        
+        # Exact boxes from MuPDF's own text search, one search per distinct
+        # string on the page instead of estimating glyph widths
+        if hits and textpage is None:
+            textpage = page.get_textpage(flags=SPAN_TEXT_FLAGS)
+        found_rects = {hit_text: page.search_for(hit_text, textpage=textpage)
+                       for hit_text in {match.group() for match, _, _ in hits}}
         
-        # Detect emails
-        email_matches = self.patterns[RedactionType.EMAIL].finditer(text)
-        for match in email_matches:
-            match_bbox = self._get_match_bbox(match, bbox, span)
+        for match, pii_type, span_index in hits:
+            span = spans[span_index]
+            text = texts[span_index]
+            start = match.start() - span_starts[span_index]
+            end = match.end() - span_starts[span_index]
+            span_bbox = fitz.Rect(span["bbox"])
+            
+            match_bbox = (self._find_match_rect(found_rects[match.group()], text, match.group(), start, span_bbox)
+                          or self._get_match_bbox(start, end, span_bbox, span))
             if match_bbox:
-                # Debug: print bbox coordinates
-                logger.debug(f"Email bbox: {match_bbox}")
+                if pii_type == RedactionType.EMAIL:
+                    # Debug: print bbox coordinates
+                    logger.debug("Email bbox: %s", match_bbox)
                 matches.append(PIIMatch(
                     text=match.group(),
-                    type=RedactionType.EMAIL,
+                    type=pii_type,
                     page_number=page_num,
                     bbox=match_bbox,
-                    confidence=1.0,
-                    context=self._get_context(text, match.start(), match.end())
+                    confidence=PII_CONFIDENCES[pii_type],
+                    context=self._get_context(text, start, end)
                 ))
         
-        # Detect SSNs
-        for pattern in self.patterns[RedactionType.SSN]:
-            ssn_matches = pattern.finditer(text)
-            for match in ssn_matches:
-                if not self._is_false_positive(match.group(), text):
-                    match_bbox = self._get_match_bbox(match, bbox, span)
-                    if match_bbox:
-                        matches.append(PIIMatch(
-                            text=match.group(),
-                            type=RedactionType.SSN,
-                            page_number=page_num,
-                            bbox=match_bbox,
-                            confidence=0.95,
-                            context=self._get_context(text, match.start(), match.end())
-                        ))
-        
-        # Detect phone numbers
-        for pattern in self.patterns[RedactionType.PHONE]:
-            phone_matches = pattern.finditer(text)
-            for match in phone_matches:
-                match_bbox = self._get_match_bbox(match, bbox, span)
-                if match_bbox:
-                    matches.append(PIIMatch(
-                        text=match.group(),
-                        type=RedactionType.PHONE,
-                        page_number=page_num,
-                        bbox=match_bbox,
-                        confidence=0.9,
-                        context=self._get_context(text, match.start(), match.end())
-                    ))
-        
-        # Detect credit cards
-        for pattern in self.patterns[RedactionType.CREDIT_CARD]:
-            cc_matches = pattern.finditer(text)
-            for match in cc_matches:
-                match_bbox = self._get_match_bbox(match, bbox, span)
-                if match_bbox:
-                    matches.append(PIIMatch(
-                        text=match.group(),
-                        type=RedactionType.CREDIT_CARD,
-                        page_number=page_num,
-                        bbox=match_bbox,
-                        confidence=0.85,
-                        context=self._get_context(text, match.start(), match.end())
-                    ))
-        
         return matches
     
-    def _get_match_bbox(self, match, span_bbox: fitz.Rect, span: Dict) -> Optional[fitz.Rect]:
-        """Calculate the bounding box for a regex match within a text span"""
+    def _find_match_rect(self, rects: List[fitz.Rect], span_text: str, hit_text: str,
+                         start_char: int, span_bbox: fitz.Rect) -> Optional[fitz.Rect]:
+        """Pick the search_for() rectangle of the match at start_char within its span"""
+        # search_for() returns every case-insensitive occurrence on the page, so
+        # the match is the n-th occurrence inside its span, counted in the text
+        span_lower = span_text.lower()
+        hit_lower = hit_text.lower()
+        in_span = sorted(
+            (rect for rect in rects
+             if span_bbox.contains(fitz.Point((rect.x0 + rect.x1) / 2, (rect.y0 + rect.y1) / 2))),
+            key=lambda rect: rect.x0
+        )
+        
+        # Fall back to estimating the box when the occurrences do not line up
+        if len(in_span) != span_lower.count(hit_lower):
+            return None
+        return in_span[span_lower.count(hit_lower, 0, start_char)]
+    
+    def _get_match_bbox(self, start_char: int, end_char: int, span_bbox: fitz.Rect, span: Dict) -> Optional[fitz.Rect]:
+        """Calculate the bounding box for a match at the given offsets within a text span"""
         try:
-            # Get character positions
-            start_char = match.start()
-            end_char = match.end()
-            
             # Calculate relative positions
             text = span["text"]
             if start_char >= len(text) or end_char > len(text):
@@ -228,7 +309,7 @@ class PDFRedactor:
             return fitz.Rect(x0, y0, x1, y1)
             
         except Exception as e:
-            logger.warning(f"Error calculating match bbox: {e}")
+            logger.warning("Error calculating match bbox: %s", e)
             return None
     
     def _get_context(self, text: str, start: int, end: int, context_chars: int = 20) -> str:
@@ -239,23 +320,14 @@ class PDFRedactor:
     
     def _is_false_positive(self, text: str, context: str) -> bool:
         """Check if detected text is a false positive"""
-        for pattern in self.false_positive_patterns:
-            if pattern.search(text):
-                return True
-        
-        # Additional context checks
-        context_lower = context.lower()
-        false_positive_indicators = [
-            'part number', 'part #', 'serial number', 'serial #',
-            'model number', 'model #', 'reference number', 'ref #',
-            'date', 'birth', 'dob'
-        ]
+        if not is_valid_ssn(text):
+            return True
         
-        for indicator in false_positive_indicators:
-            if indicator in context_lower:
-                return True
+        if FALSE_POSITIVE_PATTERN.search(text):
+            return True
         
-        return False
+        # Additional context checks
+        return FALSE_POSITIVE_INDICATOR_PATTERN.search(context) is not None
     
     def _deduplicate_matches(self, matches: List[PIIMatch]) -> List[PIIMatch]:
         """Remove duplicate and overlapping PII matches"""
@@ -268,22 +340,34 @@ class PDFRedactor:
         unique_matches = []
         seen_texts = set()
         
+        # Kept boxes per page as [x0s, bboxes, widest], sorted by x0, so a match
+        # is only tested against the kept boxes whose x range can reach it
+        # instead of against every kept match
+        kept_by_page = {}
+        
         for match in matches:
             # Check for exact text duplicates
-            if match.text.lower() in seen_texts:
+            text_key = match.text.lower()
+            if text_key in seen_texts:
                 continue
             
-            # Check for overlapping bounding boxes
-            is_overlapping = False
-            for existing_match in unique_matches:
-                if (match.page_number == existing_match.page_number and 
-                    match.bbox.intersects(existing_match.bbox)):
-                    is_overlapping = True
-                    break
+            # Check for overlapping bounding boxes; a box starting further left
+            # than the widest kept box cannot reach this one (1pt of slack
+            # covers float rounding, intersects() has the final say)
+            bbox = match.bbox
+            kept = kept_by_page.setdefault(match.page_number, [[], [], 0.0])
+            x0s, bboxes = kept[0], kept[1]
+            lo = bisect.bisect_left(x0s, bbox.x0 - kept[2] - 1)
+            hi = bisect.bisect_right(x0s, bbox.x1)
+            if any(bbox.intersects(bboxes[i]) for i in range(lo, hi)):
+                continue
             
-            if not is_overlapping:
-                unique_matches.append(match)
-                seen_texts.add(match.text.lower())
+            unique_matches.append(match)
+            seen_texts.add(text_key)
+            position = bisect.bisect_right(x0s, bbox.x0)
+            x0s.insert(position, bbox.x0)
+            bboxes.insert(position, bbox)
+            kept[2] = max(kept[2], bbox.width)
         
         return unique_matches
     
@@ -317,16 +401,7 @@ class PDFRedactor:
     
     def _get_replacement_text(self, pii_type: RedactionType, original_text: str) -> str:
         """Generate appropriate replacement text for PII type"""
-        if pii_type == RedactionType.EMAIL:
-            return "[EMAIL REDACTED]"
-        elif pii_type == RedactionType.SSN:
-            return "[SSN REDACTED]"
-        elif pii_type == RedactionType.PHONE:
-            return "[PHONE REDACTED]"
-        elif pii_type == RedactionType.CREDIT_CARD:
-            return "[CREDIT CARD REDACTED]"
-        else:
-            return "[REDACTED]"
+        return REPLACEMENT_TEXTS.get(pii_type, "[REDACTED]")
     
     def redact_pdf(self, pdf_path: Path, output_path: Path, pii_matches: List[PIIMatch]) -> bool:
         """
@@ -335,7 +410,7 @@ class PDFRedactor:
         Returns:
             True if redaction was successful
         """
-        logger.info(f"Redacting PDF: {pdf_path} -> {output_path}")
+        logger.info("Redacting PDF: %s -> %s", pdf_path, output_path)
         
         try:
             # Create redaction plan
@@ -344,13 +419,15 @@ class PDFRedactor:
             # Open PDF for redaction
             doc = fitz.open(str(pdf_path))
             
+            # Group redactions by page once, so pages without PII are never loaded
+            redactions_by_page = defaultdict(list)
+            for redaction in redaction_rectangles:
+                redactions_by_page[redaction.page_number].append(redaction)
+            
             # Apply redactions page by page
-            for page_num in range(len(doc)):
+            for page_num, page_redactions in redactions_by_page.items():
                 page = doc.load_page(page_num)
                 
-                # Get redactions for this page
-                page_redactions = [r for r in redaction_rectangles if r.page_number == page_num]
-                
                 for redaction in page_redactions:
                     # Apply redaction rectangle
                     page.add_redact_annot(
@@ -361,18 +438,17 @@ class PDFRedactor:
                     )
                 
                 # Apply all redactions on this page
-                if page_redactions:
-                    page.apply_redactions()
+                page.apply_redactions()
             
             # Save redacted PDF
             doc.save(str(output_path))
             doc.close()
             
-            logger.info(f"Redaction complete: {len(redaction_rectangles)} redactions applied")
+            logger.info("Redaction complete: %s redactions applied", len(redaction_rectangles))
             return True
             
         except Exception as e:
-            logger.error(f"Error during redaction: {str(e)}")
+            logger.error("Error during redaction: %s", e)
             return False
     
     def get_redaction_summary(self, pii_matches: List[PIIMatch]) -> Dict:
@@ -407,5 +483,16 @@ class PDFRedactor:
         
         return summary
 
+def _detect_pii_in_page_range(pdf_path: str, start: int, stop: int) -> List[PIIMatch]:
+    """Detect PII on pages [start, stop) of a PDF in a worker process"""
+    # Each worker opens the file itself; documents cannot be shared
+    with fitz.open(pdf_path) as doc:
+        pii_matches = pdf_redactor._detect_pii_in_pages(doc, range(start, stop))
+    
+    # Send plain coordinates back instead of fitz.Rect, the caller rebuilds them
+    for match in pii_matches:
+        match.bbox = tuple(match.bbox)
+    return pii_matches
+
 # Global redactor instance
 pdf_redactor = PDFRedactor() 
\ No newline at end of file
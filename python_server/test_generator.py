@@ -1,4 +1,5 @@
 import os
+import multiprocessing
 from pathlib import Path
 import fitz  # PyMuPDF
 import yaml
@@ -6,7 +7,6 @@ import random
 import string
 
 base_dir = Path("tests")
-base_dir.mkdir(exist_ok=True)
 
 def make_pdf(path, pages, encrypt_password=None, draw_image=False):
     """Create a PDF with specified content using PyMuPDF"""
@@ -42,128 +42,116 @@ def rand_text(length=80):
     """Generate random text for testing"""
     return ''.join(random.choices(string.ascii_letters + " ", k=length))
 
-expectations = {}
-
-# 1. Clean PDF - no PII
-clean_dir = base_dir / "clean"
-clean_dir.mkdir(exist_ok=True)
-clean_pdf = clean_dir / "clean-single-page.pdf"
-make_pdf(clean_pdf, [rand_text()])
-expectations[clean_pdf.name] = {"emails": [], "ssns": [], "status": "SUCCESS"}
-
-# 2. Happy-path - simple PII
-happy_dir = base_dir / "happy-path"
-happy_dir.mkdir(exist_ok=True)
-happy_pdf = happy_dir / "simple-pii.pdf"
-make_pdf(happy_pdf, ["Contact us at help@example.com and SSN 123-45-6789"])
-expectations[happy_pdf.name] = {"emails": ["help@example.com"], "ssns": ["123-45-6789"], "status": "SUCCESS"}
-
-# 3. Multipage PII
-multi_dir = base_dir / "multipage"
-multi_dir.mkdir(exist_ok=True)
-multi_pdf = multi_dir / "multipage-pii.pdf"
-pages = [rand_text() for _ in range(7)]
-pages[2] = "Reach bob@company.org for details."
-pages[6] = "Employee SSN is 987-65-4321."
-make_pdf(multi_pdf, pages)
-expectations[multi_pdf.name] = {"emails": ["bob@company.org"], "ssns": ["987-65-4321"], "status": "SUCCESS"}
-
-# 4. SSN without dashes
-ssn_dir = base_dir / "ssn-nodash"
-ssn_dir.mkdir(exist_ok=True)
-ssn_pdf = ssn_dir / "ssn-nodash.pdf"
-make_pdf(ssn_pdf, ["Alternate SSN format 111223333"])
-expectations[ssn_pdf.name] = {"emails": [], "ssns": ["111223333"], "status": "SUCCESS"}
-
-# 5. Email edge cases
-edge_dir = base_dir / "email-edgecases"
-edge_dir.mkdir(exist_ok=True)
-edge_pdf = edge_dir / "email-edgecases.pdf"
-make_pdf(edge_pdf, ["Contact first.last+alias@sub.domain.co.uk ASAP"])
-expectations[edge_pdf.name] = {"emails": ["first.last+alias@sub.domain.co.uk"], "ssns": [], "status": "SUCCESS"}
-
-# 6. Oversize (100 pages)
-oversize_dir = base_dir / "oversize"
-oversize_dir.mkdir(exist_ok=True)
-oversize_pdf = oversize_dir / "oversize-pii.pdf"
-oversize_pages = ["Oversize doc with foo@bar.com on page 1"] + [rand_text() for _ in range(99)]
-make_pdf(oversize_pdf, oversize_pages)
-expectations[oversize_pdf.name] = {"emails": ["foo@bar.com"], "ssns": [], "status": "SUCCESS"}
-
-# 7. Corrupt PDF (invalid content)
-corrupt_dir = base_dir / "corrupt"
-corrupt_dir.mkdir(exist_ok=True)
-corrupt_pdf = corrupt_dir / "corrupt.pdf"
-# Create a completely invalid PDF file
-with open(corrupt_pdf, "wb") as f:
-    f.write(b"This is not a valid PDF file content")
-expectations[corrupt_pdf.name] = {"emails": [], "ssns": [], "status": "FAILED"}
-
-# 8. Encrypted PDF
-encrypted_dir = base_dir / "encrypted"
-encrypted_dir.mkdir(exist_ok=True)
-encrypted_pdf = encrypted_dir / "encrypted.pdf"
-make_pdf(encrypted_pdf, ["Secret info admin@secure.com"], encrypt_password="secret123")
-expectations[encrypted_pdf.name] = {"emails": [], "ssns": [], "status": "FAILED"}
-
-# 9. Scanned image placeholder
-scan_dir = base_dir / "scanned-image"
-scan_dir.mkdir(exist_ok=True)
-scan_pdf = scan_dir / "scanned-image.pdf"
-make_pdf(scan_pdf, ["Scanned page placeholder"], draw_image=True)
-expectations[scan_pdf.name] = {"emails": [], "ssns": [], "status": "SUCCESS"}
-
-# 10. False-positive bait
-fp_dir = base_dir / "false-positive"
-fp_dir.mkdir(exist_ok=True)
-fp_pdf = fp_dir / "false-positive-bait.pdf"
-make_pdf(fp_pdf, ["Part number 123-45-678, not SSN"])
-expectations[fp_pdf.name] = {"emails": [], "ssns": [], "status": "SUCCESS"}
-
-# 11. Multiple PII types
-multi_pii_dir = base_dir / "multi-pii"
-multi_pii_dir.mkdir(exist_ok=True)
-multi_pii_pdf = multi_pii_dir / "multi-pii.pdf"
-make_pdf(multi_pii_pdf, [
-    "Contact: john.doe@company.com",
-    "SSN: 555-12-3456",
-    "Email: jane.smith@example.org",
-    "SSN: 987-65-4321"
-])
-expectations[multi_pii_pdf.name] = {
-    "emails": ["john.doe@company.com", "jane.smith@example.org"], 
-    "ssns": ["555-12-3456", "987-65-4321"], 
-    "status": "SUCCESS"
-}
-
-# 12. Complex email formats
-complex_email_dir = base_dir / "complex-email"
-complex_email_dir.mkdir(exist_ok=True)
-complex_email_pdf = complex_email_dir / "complex-email.pdf"
-make_pdf(complex_email_pdf, [
-    "Emails: test@domain.com, user+tag@subdomain.org, admin@company.co.uk"
-])
-expectations[complex_email_pdf.name] = {
-    "emails": ["test@domain.com", "user+tag@subdomain.org", "admin@company.co.uk"], 
-    "ssns": [], 
-    "status": "SUCCESS"
-}
-
-# Write expectations.yaml
-exp_path = base_dir / "expectations.yaml"
-with open(exp_path, "w") as f:
-    yaml.dump(expectations, f, sort_keys=False)
+def build_case(path, pages, encrypt_password=None, draw_image=False):
+    """Write one test PDF; pages=None writes a file that is not a valid PDF"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if pages is None:
+        # Create a completely invalid PDF file
+        with open(path, "wb") as f:
+            f.write(b"This is not a valid PDF file content")
+    else:
+        make_pdf(path, pages, encrypt_password, draw_image)
 
-print(f"Test corpus generated at {base_dir}")
-print(f"Expectations written to {exp_path}")
-print(f"Generated {len(expectations)} test cases:")
-for test_name, expected in expectations.items():
-    print(f"  - {test_name}: {expected['status']} ({len(expected['emails'])} emails, {len(expected['ssns'])} SSNs)")
+def build_test_cases():
+    """
+    Describe every test PDF to generate
+    
+    Returns:
+        List of (path, pages, encrypt_password, draw_image, expected) tuples
+    """
+    cases = []
+    
+    # 1. Clean PDF - no PII
+    cases.append((base_dir / "clean" / "clean-single-page.pdf", [rand_text()], None, False,
+                  {"emails": [], "ssns": [], "status": "SUCCESS"}))
+    
+    # 2. Happy-path - simple PII
+    cases.append((base_dir / "happy-path" / "simple-pii.pdf",
+                  ["Contact us at help@example.com and SSN 123-45-6789"], None, False,
+                  {"emails": ["help@example.com"], "ssns": ["123-45-6789"], "status": "SUCCESS"}))
+    
+    # 3. Multipage PII
+    pages = [rand_text() for _ in range(7)]
+    pages[2] = "Reach bob@company.org for details."
+    pages[6] = "Employee SSN is 987-65-4321."
+    cases.append((base_dir / "multipage" / "multipage-pii.pdf", pages, None, False,
+                  {"emails": ["bob@company.org"], "ssns": ["987-65-4321"], "status": "SUCCESS"}))
+    
+    # 4. SSN without dashes
+    cases.append((base_dir / "ssn-nodash" / "ssn-nodash.pdf", ["Alternate SSN format 111223333"], None, False,
+                  {"emails": [], "ssns": ["111223333"], "status": "SUCCESS"}))
+    
+    # 5. Email edge cases
+    cases.append((base_dir / "email-edgecases" / "email-edgecases.pdf",
+                  ["Contact first.last+alias@sub.domain.co.uk ASAP"], None, False,
+                  {"emails": ["first.last+alias@sub.domain.co.uk"], "ssns": [], "status": "SUCCESS"}))
+    
+    # 6. Oversize (100 pages)
+    oversize_pages = ["Oversize doc with foo@bar.com on page 1"] + [rand_text() for _ in range(99)]
+    cases.append((base_dir / "oversize" / "oversize-pii.pdf", oversize_pages, None, False,
+                  {"emails": ["foo@bar.com"], "ssns": [], "status": "SUCCESS"}))
+    
+    # 7. Corrupt PDF (invalid content)
+    cases.append((base_dir / "corrupt" / "corrupt.pdf", None, None, False,
+                  {"emails": [], "ssns": [], "status": "FAILED"}))
+    
+    # 8. Encrypted PDF
+    cases.append((base_dir / "encrypted" / "encrypted.pdf", ["Secret info admin@secure.com"], "secret123", False,
+                  {"emails": [], "ssns": [], "status": "FAILED"}))
+    
+    # 9. Scanned image placeholder
+    cases.append((base_dir / "scanned-image" / "scanned-image.pdf", ["Scanned page placeholder"], None, True,
+                  {"emails": [], "ssns": [], "status": "SUCCESS"}))
+    
+    # 10. False-positive bait
+    cases.append((base_dir / "false-positive" / "false-positive-bait.pdf",
+                  ["Part number 123-45-678, not SSN"], None, False,
+                  {"emails": [], "ssns": [], "status": "SUCCESS"}))
+    
+    # 11. Multiple PII types
+    cases.append((base_dir / "multi-pii" / "multi-pii.pdf", [
+        "Contact: john.doe@company.com",
+        "SSN: 555-12-3456",
+        "Email: jane.smith@example.org",
+        "SSN: 987-65-4321"
+    ], None, False, {
+        "emails": ["john.doe@company.com", "jane.smith@example.org"], 
+        "ssns": ["555-12-3456", "987-65-4321"], 
+        "status": "SUCCESS"
+    }))
+    
+    # 12. Complex email formats
+    cases.append((base_dir / "complex-email" / "complex-email.pdf", [
+        "Emails: test@domain.com, user+tag@subdomain.org, admin@company.co.uk"
+    ], None, False, {
+        "emails": ["test@domain.com", "user+tag@subdomain.org", "admin@company.co.uk"], 
+        "ssns": [], 
+        "status": "SUCCESS"
+    }))
+    
+    return cases
 
 def main():
     """Main function to generate test corpus"""
-    # The test generation code is already executed when the module is imported
-    pass
+    base_dir.mkdir(exist_ok=True)
+    cases = build_test_cases()
+    
+    # Every PDF is independent of the others, so build them in parallel
+    with multiprocessing.Pool(min(os.cpu_count() or 1, len(cases))) as pool:
+        pool.starmap(build_case, [case[:4] for case in cases])
+    
+    expectations = {path.name: expected for path, _, _, _, expected in cases}
+    
+    # Write expectations.yaml
+    exp_path = base_dir / "expectations.yaml"
+    with open(exp_path, "w") as f:
+        yaml.dump(expectations, f, sort_keys=False)
+    
+    print(f"Test corpus generated at {base_dir}")
+    print(f"Expectations written to {exp_path}")
+    print(f"Generated {len(expectations)} test cases:")
+    for test_name, expected in expectations.items():
+        print(f"  - {test_name}: {expected['status']} ({len(expected['emails'])} emails, {len(expected['ssns'])} SSNs)")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,14 +1,58 @@
+import functools
+import math
+import os
+import orjson
 import yaml
+try:
+    # libyaml bindings parse and emit several times faster than the
+    # pure-Python implementation
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
 import time
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from dataclasses import asdict
 import logging
 from pdf_parser import pdf_parser
+from concurrent.futures import ProcessPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ResultsDumper(SafeDumper):
+    """YAML dumper that writes lists of plain values, like emails and SSNs, inline"""
+
+def _represent_list(dumper: ResultsDumper, data: list):
+    """Represent a list in flow style unless it holds nested collections"""
+    flow_style = not any(isinstance(item, (dict, list)) for item in data)
+    return dumper.represent_sequence('tag:yaml.org,2002:seq', data, flow_style=flow_style)
+
+ResultsDumper.add_representer(list, _represent_list)
+
+# Processes used to parse test PDFs when the runner is started from the
+# command line; a couple of cores are left free for the rest of the machine
+TEST_WORKERS = int(os.getenv("TEST_WORKERS", max(1, (os.cpu_count() or 1) - 2)))
+
+# Where the command-line runner writes its report; a .jsonl name selects
+# JSON Lines instead of YAML
+TEST_RESULTS_FILE = os.getenv("TEST_RESULTS_FILE", "test_results.yaml")
+
+def _scandir_pdfs(path) -> Iterator[os.DirEntry]:
+    """Yield the entries of PDF files under path, recursing into subdirectories"""
+    # DirEntry caches the file type from the directory listing, so this
+    # avoids the extra stat() calls and Path objects that rglob makes
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _scandir_pdfs(entry.path)
+                elif entry.name.endswith(".pdf") and entry.is_file():
+                    yield entry
+    except PermissionError:
+        logger.warning("Skipping unreadable directory: %s", path)
+
 class TestRunner:
     """Test runner for PDF parsing functionality"""
     
@@ -16,54 +60,82 @@ class TestRunner:
         self.test_dir = test_dir
         self.expectations_file = test_dir / "expectations.yaml"
         self.results = {}
+        # Parsed expectations and the modification time they were read at
+        self._expectations = None
+        self._expectations_mtime = None
+        # Expected emails and SSNs of each test as sets, built with the
+        # expectations; the dicts themselves keep lists so they serialize
+        self._expected_sets = {}
         
     def load_expectations(self) -> Dict:
-        """Load test expectations from YAML file"""
+        """Load test expectations from YAML file, re-parsing only when it changes"""
         if not self.expectations_file.exists():
             raise FileNotFoundError(f"Expectations file not found: {self.expectations_file}")
         
-        with open(self.expectations_file, 'r') as f:
-            return yaml.safe_load(f)
+        mtime = self.expectations_file.stat().st_mtime_ns
+        if self._expectations is None or mtime != self._expectations_mtime:
+            with open(self.expectations_file, 'r') as f:
+                self._expectations = yaml.load(f, Loader=SafeLoader)
+            self._expectations_mtime = mtime
+            self._expected_sets = {
+                test_name: (frozenset(expected["emails"]), frozenset(expected["ssns"]))
+                for test_name, expected in self._expectations.items()
+            }
+        
+        return self._expectations
     
-    def find_test_pdfs(self) -> List[Path]:
-        """Find all PDF test files"""
-        pdf_files = []
-        for pdf_file in self.test_dir.rglob("*.pdf"):
-            pdf_files.append(pdf_file)
-        return sorted(pdf_files)
+    def find_expected_pdfs(self, test_names: Iterable[str]) -> Dict[str, Tuple[Path, int]]:
+        """Find the PDF and size of each named test, warning about PDFs without expectations"""
+        # The whole tree is walked so every unexpected PDF is reported,
+        # whatever order the directory listing comes back in
+        expected = set(test_names)
+        found = {}
+        for entry in _scandir_pdfs(self.test_dir):
+            if entry.name not in expected:
+                logger.warning("No expectations found for %s", entry.name)
+            elif entry.name not in found:
+                found[entry.name] = (Path(entry.path), entry.stat().st_size)
+        return found
     
-    def run_single_test(self, pdf_path: Path) -> Dict:
-        """Run a single test case"""
-        logger.info(f"Testing: {pdf_path.name}")
+    @staticmethod
+    def run_single_test(pdf_path: Path, file_size: Optional[int] = None) -> Dict:
+        """Run a single test case; file_size is looked up when not given"""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Testing: %s", pdf_path.name)
         
         start_time = time.time()
-        result = pdf_parser.parse_pdf(pdf_path)
+        result = asdict(pdf_parser.parse_pdf(pdf_path))
         processing_time = time.time() - start_time
         
         result["processing_time"] = processing_time
-        result["file_size"] = pdf_path.stat().st_size
+        result["file_size"] = pdf_path.stat().st_size if file_size is None else file_size
         
         return result
     
-    def run_all_tests(self) -> Dict:
-        """Run all test cases"""
+    def run_all_tests(self, workers: int = 1) -> Dict:
+        """Run all test cases, parsing up to workers PDFs at once"""
         logger.info("Starting test suite...")
         
         # Load expectations
         expectations = self.load_expectations()
         
-        # Find test PDFs
-        test_pdfs = self.find_test_pdfs()
-        logger.info(f"Found {len(test_pdfs)} test PDFs")
+        # Find test PDFs; they sit in per-case subdirectories, so index them
+        # by file name and look each expected test up in the index
+        test_pdfs = self.find_expected_pdfs(expectations)
+        logger.info("Found %s of %s expected test PDFs", len(test_pdfs), len(expectations))
         
         # Run tests
-        for pdf_path in test_pdfs:
-            test_name = pdf_path.name
-            if test_name in expectations:
-                result = self.run_single_test(pdf_path)
-                self.results[test_name] = result
-            else:
-                logger.warning(f"No expectations found for {test_name}")
+        selected = [test_pdfs[test_name] for test_name in expectations if test_name in test_pdfs]
+        
+        if workers > 1 and len(selected) > 1:
+            # Each PDF is parsed independently, so they can run side by side
+            with ProcessPoolExecutor(max_workers=min(workers, len(selected))) as executor:
+                results = executor.map(self.run_single_test, *zip(*selected))
+                for (pdf_path, _), result in zip(selected, results):
+                    self.results[pdf_path.name] = result
+        else:
+            for pdf_path, file_size in selected:
+                self.results[pdf_path.name] = self.run_single_test(pdf_path, file_size)
         
         return self.results
     
@@ -77,38 +149,47 @@ class TestRunner:
             "details": {}
         }
         
+        # Bound once here; the loop below only touches locals
+        results = self.results
+        expected_sets = self._expected_sets
+        details = comparison["details"]
+        passed_count = 0
+        
         for test_name, expected in expectations.items():
-            if test_name not in self.results:
-                comparison["details"][test_name] = {
+            actual = results.get(test_name)
+            if actual is None:
+                details[test_name] = {
                     "status": "MISSING",
                     "expected": expected,
                     "actual": None,
                     "passed": False
                 }
-                comparison["failed"] += 1
                 continue
             
-            actual = self.results[test_name]
+            actual_status = actual["status"]
+            actual_emails = actual["emails"]
+            actual_ssns = actual["ssns"]
+            expected_emails, expected_ssns = expected_sets[test_name]
             
             # Compare status
-            status_match = actual["status"] == expected["status"]
+            status_match = actual_status == expected["status"]
             
             # Compare emails (order doesn't matter)
-            emails_match = set(actual["emails"]) == set(expected["emails"])
+            emails_match = set(actual_emails) == expected_emails
             
             # Compare SSNs (order doesn't matter)
-            ssns_match = set(actual["ssns"]) == set(expected["ssns"])
+            ssns_match = set(actual_ssns) == expected_ssns
             
             # Overall test result
             passed = status_match and emails_match and ssns_match
             
-            comparison["details"][test_name] = {
+            details[test_name] = {
                 "status": "PASSED" if passed else "FAILED",
                 "expected": expected,
                 "actual": {
-                    "status": actual["status"],
-                    "emails": actual["emails"],
-                    "ssns": actual["ssns"],
+                    "status": actual_status,
+                    "emails": actual_emails,
+                    "ssns": actual_ssns,
                     "processing_time": actual.get("processing_time", 0),
                     "text_length": actual.get("text_length", 0),
                     "pages_processed": actual.get("pages_processed", 0)
@@ -120,10 +201,10 @@ class TestRunner:
             }
             
             if passed:
-                comparison["passed"] += 1
-            else:
-                comparison["failed"] += 1
+                passed_count += 1
         
+        comparison["passed"] = passed_count
+        comparison["failed"] = len(expectations) - passed_count
         return comparison
     
     def print_summary(self, comparison: Dict):
@@ -153,24 +234,51 @@ class TestRunner:
         
         print("\nPERFORMANCE SUMMARY:")
         print("-" * 40)
-        processing_times = [
-            details["actual"]["processing_time"] 
-            for details in comparison["details"].values() 
-            if details["actual"] and details["actual"]["processing_time"]
-        ]
-        if processing_times:
-            avg_time = sum(processing_times) / len(processing_times)
-            max_time = max(processing_times)
-            min_time = min(processing_times)
+        # Count, total, min and max gathered in one pass over the results
+        count = 0
+        total_time = 0.0
+        min_time = math.inf
+        max_time = -math.inf
+        for details in comparison["details"].values():
+            if details["actual"] and (processing_time := details["actual"]["processing_time"]):
+                count += 1
+                total_time += processing_time
+                min_time = min(min_time, processing_time)
+                max_time = max(max_time, processing_time)
+        if count:
+            avg_time = total_time / count
             print(f"Average processing time: {avg_time:.3f}s")
             print(f"Min processing time: {min_time:.3f}s")
             print(f"Max processing time: {max_time:.3f}s")
     
     def save_results(self, comparison: Dict, output_file: str = "test_results.yaml"):
-        """Save test results to file"""
-        with open(output_file, 'w') as f:
-            yaml.dump(comparison, f, default_flow_style=False, sort_keys=False)
-        logger.info(f"Results saved to {output_file}")
+        """Save test results to file, as JSON Lines when it ends in .jsonl"""
+        if output_file.endswith(".jsonl"):
+            # A totals line, then one line per test written as it is reached,
+            # so the whole report is never serialized into one buffer
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps({key: value for key, value in comparison.items() if key != "details"}))
+                f.write(b"\n")
+                for test_name, details in comparison["details"].items():
+                    f.write(orjson.dumps({"test": test_name, **details}))
+                    f.write(b"\n")
+        else:
+            with open(output_file, 'w') as f:
+                yaml.dump(comparison, f, Dumper=ResultsDumper, default_flow_style=False, sort_keys=False)
+        logger.info("Results saved to %s", output_file)
+
+@functools.lru_cache(maxsize=1)
+def get_test_runner() -> TestRunner:
+    """Get the shared test runner instance, creating it on first use"""
+    return TestRunner()
+
+def run_test_suite() -> Dict:
+    """Run all test cases with the shared runner and compare them with expectations"""
+    runner = get_test_runner()
+    # Start from a clean slate so results of removed PDFs do not linger
+    runner.results.clear()
+    runner.run_all_tests()
+    return runner.compare_results()
 
 def main():
     """Main test execution function"""
@@ -178,7 +286,7 @@ def main():
     
     try:
         # Run all tests
-        results = runner.run_all_tests()
+        results = runner.run_all_tests(workers=TEST_WORKERS)
         
         # Compare with expectations
         comparison = runner.compare_results()
@@ -187,13 +295,13 @@ def main():
         runner.print_summary(comparison)
         
         # Save results
-        runner.save_results(comparison)
+        runner.save_results(comparison, TEST_RESULTS_FILE)
         
         # Return exit code
         return 0 if comparison["failed"] == 0 else 1
         
     except Exception as e:
-        logger.error(f"Test execution failed: {e}")
+        logger.error("Test execution failed: %s", e)
         return 1
 
 if __name__ == "__main__":
@@ -6,6 +6,8 @@ Tests redaction on a basic PDF with PII
 
 import sys
 import os
+import time
+import traceback
 from pathlib import Path
 
 # Add parent directory to Python path
@@ -29,7 +31,9 @@ def test_simple_redaction():
         
         # Step 1: Detect PII
         print("🔍 Detecting PII...")
+        detect_start = time.perf_counter()
         pii_matches, metadata = pdf_redactor.detect_pii_with_coordinates(test_pdf_path)
+        detect_time = time.perf_counter() - detect_start
         
         # Count by type
         email_count = sum(1 for match in pii_matches if match.type == RedactionType.EMAIL)
@@ -39,6 +43,7 @@ def test_simple_redaction():
         print(f"   - Emails detected: {email_count}")
         print(f"   - SSNs detected: {ssn_count}")
         print(f"   - Total PII items: {len(pii_matches)}")
+        print(f"   - Detection time: {detect_time * 1000:.1f} ms")
         
         # Show what was detected
         for i, match in enumerate(pii_matches, 1):
@@ -51,7 +56,9 @@ def test_simple_redaction():
         # Step 2: Perform redaction
         print("\n🔴 Performing redaction...")
         output_pdf_path = Path("simple_redacted_output.pdf")
+        redact_start = time.perf_counter()
         redaction_success = pdf_redactor.redact_pdf(test_pdf_path, output_pdf_path, pii_matches)
+        redact_time = time.perf_counter() - redact_start
         
         # Verify redaction succeeded
         assert redaction_success, "Redaction should succeed"
@@ -65,6 +72,7 @@ def test_simple_redaction():
         print(f"   - Total redactions: {summary['total_redactions']}")
         print(f"   - Redactions by type: {summary['redactions_by_type']}")
         print(f"   - Output file: {output_pdf_path}")
+        print(f"   - Redaction time: {redact_time * 1000:.1f} ms")
         
         # Check file sizes
         original_size = test_pdf_path.stat().st_size
@@ -82,7 +90,6 @@ def test_simple_redaction():
         
     except Exception as e:
         print(f"❌ Simple Redaction Test FAILED: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
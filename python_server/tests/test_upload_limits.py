@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Upload Size Limit Test
+Tests that oversized uploads are rejected with 413 before being read
+"""
+
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import main
+
+def test_oversized_upload_rejected():
+    """Test that an upload declaring a body over the limit gets a 413"""
+    print("🧪 Testing Oversized Upload Rejection...")
+    
+    # A small limit keeps the request body small; the client is not used as
+    # a context manager, so startup (ClickHouse, process pool) never runs
+    original_limit = main.MAX_UPLOAD_BYTES
+    main.MAX_UPLOAD_BYTES = 1024
+    try:
+        client = TestClient(main.app)
+        body = b"%PDF-1.4\n" + b"0" * (main.MAX_UPLOAD_BYTES + main.MULTIPART_OVERHEAD_BYTES)
+        response = client.post(
+            "/api/upload-pdf",
+            files={"file": ("large.pdf", body, "application/pdf")}
+        )
+    finally:
+        main.MAX_UPLOAD_BYTES = original_limit
+    
+    print(f"📊 Response: {response.status_code} {response.json()}")
+    
+    assert response.status_code == 413, "Oversized upload should be rejected"
+    assert response.json() == {"detail": "PDF file is too large"}
+    
+    print("✅ Oversized Upload Test PASSED")
+
+if __name__ == "__main__":
+    test_oversized_upload_rejected()
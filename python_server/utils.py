@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+try:
+    # RE2 matches in linear time with no backtracking; the PII patterns use
+    # nothing it lacks, so the stdlib engine is only a fallback
+    import re2 as re_engine
+except ImportError:
+    import re as re_engine
+
+# Masks are sliced from this instead of building a new run of stars per item
+_STARS = '*' * 256
+
+def mask_pii_data(data: str) -> str:
+    """Mask PII data by showing only the first character and replacing the rest with asterisks"""
+    if not data or len(data) <= 1:
+        return data
+    if len(data) > len(_STARS):
+        return data[0] + '*' * (len(data) - 1)
+    return data[0] + _STARS[:len(data) - 1]
+
+def mask_pii_list(data_list: List[str]) -> List[str]:
+    """Mask a list of PII data items"""
+    # Same rule as mask_pii_data, inlined to skip a function call per item
+    return [item[0] + _STARS[:len(item) - 1] if 1 < len(item) <= len(_STARS) else mask_pii_data(item)
+            for item in data_list]
+
+def is_valid_ssn(ssn: str) -> bool:
+    """Check that an SSN avoids the area, group and serial numbers never issued"""
+    digits = ''.join(ch for ch in ssn if ch.isdigit())
+    if len(digits) != 9:
+        return False
+    return digits[:3] not in ('000', '666') and digits[3:5] != '00' and digits[5:] != '0000'
+
+def passes_luhn(number: str) -> bool:
+    """Check the Luhn checksum that every payment card number carries"""
+    checksum = 0
+    for position, ch in enumerate(reversed([ch for ch in number if ch.isdigit()])):
+        digit = int(ch)
+        if position % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        checksum += digit
+    return checksum % 10 == 0
+
+class LRUCache:
+    """Thread-safe mapping that keeps only the most recently used entries"""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get the value for key and mark it recently used, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def pop(self, key: Hashable):
+        """Remove key if it is present"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
@@ -20,6 +20,11 @@ def test_clickhouse_setup():
         # Get client
         client = get_clickhouse_client()
         
+        # Every caller should share the one pooled client, not reconnect
+        if get_clickhouse_client() is not client:
+            print("   ❌ ClickHouse client is not shared between callers")
+            return False
+        
         # Test connection
         print("1. Testing connection...")
         if client.test_connection():
@@ -30,15 +35,26 @@ def test_clickhouse_setup():
         
         # Test inserting data
         print("2. Testing data insertion...")
-        success = client.insert_scan_result(
-            doc_id="test-doc-002",
-            emails=["test@example.com", "user@company.org"],
-            ssns=["987-65-4321"],
-            source_path="/uploads/test-file.pdf",
-            file_size=2048000,
-            scan_duration=2.1,
-            status="completed"
-        )
+        success = client.insert_scan_results_batch([
+            {
+                "doc_id": "test-doc-002",
+                "emails": ["test@example.com", "user@company.org"],
+                "ssns": ["987-65-4321"],
+                "source_path": "/uploads/test-file.pdf",
+                "file_size": 2048000,
+                "scan_duration": 2.1,
+                "status": "completed"
+            },
+            {
+                "doc_id": "test-doc-003",
+                "emails": [],
+                "ssns": [],
+                "source_path": "/uploads/clean-file.pdf",
+                "file_size": 512000,
+                "scan_duration": 0.4,
+                "status": "completed"
+            }
+        ])
         
         if success:
             print("   ✅ Data insertion successful")